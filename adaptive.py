@@ -0,0 +1,201 @@
+import operator
+import sys
+
+from expr import *
+from interpreter import Interpreter
+from operators import binary_handlers, unary_handlers
+from output import Output
+from tokens import TokenType as tt
+
+NoneType = type(None)
+
+# How many runs in a row a node must see the same operand types for before
+# it specializes for them. Each time a node deoptimizes, it waits twice as
+# long before specializing again, up to max_backoff runs.
+warmup = 2
+max_backoff = 64
+
+# What a node specialized for an operator and its operands' classes does:
+# the plain Python operation, applied without checking the operands again.
+# Operators and operands that aren't here always run the generic handler,
+# which reports errors.
+binary_specializations = {
+    (tt.PLUS, float, float):            operator.add,
+    (tt.PLUS, str, str):                operator.add,
+    (tt.MINUS, float, float):           operator.sub,
+    (tt.STAR, float, float):            operator.mul,
+    (tt.SLASH, float, float):           operator.truediv,
+    (tt.GREATER, float, float):         operator.gt,
+    (tt.GREATER_EQUAL, float, float):   operator.ge,
+    (tt.LESS, float, float):            operator.lt,
+    (tt.LESS_EQUAL, float, float):      operator.le,
+}
+# Equality means the same for any operands.
+for left in (float, str, bool, NoneType):
+    for right in (float, str, bool, NoneType):
+        binary_specializations[tt.EQUAL_EQUAL, left, right] = operator.eq
+        binary_specializations[tt.BANG_EQUAL, left, right] = operator.ne
+del left, right
+
+unary_specializations = {
+    (tt.MINUS, float):                  operator.neg,
+    # Python's not agrees with Lox's ! on these, not on numbers or strings.
+    (tt.BANG, bool):                    operator.not_,
+    (tt.BANG, NoneType):                operator.not_,
+}
+
+
+class Feedback:
+    """
+    The operand types one Binary or Unary node has seen, and what it is
+    specialized for.
+
+    While the node is specialized, left and right are the classes of
+    operands it expects (right alone for a Unary, whose only operand is
+    right) and apply the operation for them; otherwise all three are None,
+    which no operand's class is. hits counts the runs that took the
+    specialized path, misses those whose operands failed its check and
+    deoptimized it, and generic those that ran the generic handler while
+    the node wasn't specialized.
+    """
+    __slots__ = ('node', 'left', 'right', 'apply', 'seen', 'countdown',
+                 'backoff', 'hits', 'misses', 'generic')
+
+    def __init__(self, node: Expr):
+        self.node = node
+        self.left = None
+        self.right = None
+        self.apply = None
+        self.seen = None
+        self.countdown = warmup
+        self.backoff = warmup
+        self.hits = 0
+        self.misses = 0
+        self.generic = 0
+
+    @property
+    def runs(self) -> int:
+        return self.hits + self.misses + self.generic
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.runs if self.runs else 0.0
+
+    @property
+    def specialized(self) -> bool:
+        return self.apply is not None
+
+    def observe(self, types: tuple, specializations: dict):
+        """
+        Record a generic run with operands of classes types, specializing
+        the node once enough runs in a row have seen them.
+        """
+        self.generic += 1
+        if types != self.seen:
+            self.seen = types
+            self.countdown = self.backoff
+            return
+        self.countdown -= 1
+        if self.countdown > 0:
+            return
+        apply = specializations.get((self.node.operator.type,) + types)
+        if apply is None:
+            self.countdown = self.backoff
+            return
+        self.apply = apply
+        if len(types) == 2:
+            self.left, self.right = types
+        else:
+            self.right, = types
+
+    def deoptimize(self):
+        """Count a miss and go back to the generic handler."""
+        self.misses += 1
+        self.left = self.right = self.apply = self.seen = None
+        self.backoff = min(self.backoff * 2, max_backoff)
+        self.countdown = self.backoff
+
+    def describe(self) -> str:
+        if not self.specialized:
+            return 'generic'
+        types = (self.right,) if self.left is None else (self.left,
+                                                        self.right)
+        return '/'.join(type.__name__ for type in types)
+
+
+class AdaptiveInterpreter(Interpreter):
+    """
+    An Interpreter whose Binary and Unary nodes specialize themselves for
+    the operand types they see.
+
+    A node starts out running its generic handler, recording the classes
+    of its operands in a Feedback. Once it has seen the same ones a few
+    runs in a row, it applies the plain Python operation for them directly,
+    behind a check that the operands are still of those classes. When they
+    aren't, the node deoptimizes: it runs the generic handler, which
+    reports any error, and starts observing again. Output and errors are
+    the same as Interpreter's.
+
+    feedback lists the Feedback this interpreter gave each node it ran,
+    see report().
+    """
+    def __init__(self, output: Output = None):
+        super().__init__(output)
+        self.feedback = []
+
+    # Operands are visited directly rather than through evaluate(), which
+    # saves a call per operand on top of what specializing does.
+    def visitBinaryExpr(self, expr: Binary):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        feedback = expr.feedback
+        if (feedback is not None and left.__class__ is feedback.left
+                and right.__class__ is feedback.right):
+            feedback.hits += 1
+            return feedback.apply(left, right)
+
+        if feedback is None:
+            feedback = expr.feedback = Feedback(expr)
+            self.feedback.append(feedback)
+        if feedback.specialized:
+            feedback.deoptimize()
+        else:
+            feedback.observe((left.__class__, right.__class__),
+                             binary_specializations)
+        handler = expr.handler or binary_handlers[expr.operator.type]
+        return handler(expr.operator, left, right)
+
+    def visitUnaryExpr(self, expr: Unary):
+        right = expr.right.accept(self)
+        feedback = expr.feedback
+        if feedback is not None and right.__class__ is feedback.right:
+            feedback.hits += 1
+            return feedback.apply(right)
+
+        if feedback is None:
+            feedback = expr.feedback = Feedback(expr)
+            self.feedback.append(feedback)
+        if feedback.specialized:
+            feedback.deoptimize()
+        else:
+            feedback.observe((right.__class__,), unary_specializations)
+        handler = expr.handler or unary_handlers[expr.operator.type]
+        return handler(expr.operator, right)
+
+    def report(self, file=None, limit: int = 20):
+        """Print the hits and misses of the nodes run most often."""
+        file = sys.stderr if file is None else file
+        feedback = sorted(self.feedback, key=lambda item: item.runs,
+                          reverse=True)
+        hits = sum(item.hits for item in feedback)
+        runs = sum(item.runs for item in feedback)
+        rate = hits / runs if runs else 0.0
+        print(f'[adaptive] {len(feedback)} nodes, {hits} of {runs} runs '
+              f'specialized ({rate:.1%})', file=file)
+        print(f'{"runs":>10} {"hits":>10} {"misses":>8} {"rate":>7}  '
+              f'line  node', file=file)
+        for item in feedback[:limit]:
+            token = item.node.operator
+            print(f'{item.runs:10} {item.hits:10} {item.misses:8} '
+                  f'{item.hit_rate:7.1%}  {token.line:4}  '
+                  f'{token.lexeme} {item.describe()}', file=file)
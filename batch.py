@@ -0,0 +1,138 @@
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from typing import Iterable, List
+
+import pylox
+
+
+class ScriptResult:
+    """
+    The outcome of one script in a batch: its exit status, as a separate
+    `pylox.py script` run would have exited (0, 65 after syntax errors, 70
+    after a runtime error, 1 if pylox itself failed), what it wrote to
+    stdout and stderr, and how long it took.
+    """
+    __slots__ = ('path', 'status', 'stdout', 'stderr', 'seconds')
+
+    def __init__(self, path: str, status: int, stdout: str, stderr: str,
+                 seconds: float):
+        self.path = path
+        self.status = status
+        self.stdout = stdout
+        self.stderr = stderr
+        self.seconds = seconds
+
+    def as_json(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def find_scripts(targets: Iterable[str]) -> List[str]:
+    """
+    Return the scripts to run for targets, in order: every .lox file under
+    a directory (sorted), a .lox file itself, and the paths listed one per
+    line in any other file.
+    """
+    scripts = []
+    for target in targets:
+        if os.path.isdir(target):
+            found = []
+            for directory, _, names in os.walk(target):
+                found.extend(os.path.join(directory, name) for name in names
+                             if name.endswith('.lox'))
+            scripts.extend(sorted(found))
+        elif target.endswith('.lox'):
+            scripts.append(target)
+        else:
+            with open(target, encoding='utf-8') as file:
+                scripts.extend(line.strip() for line in file if line.strip())
+    return scripts
+
+
+def run_script(path: str, options: pylox.Options) -> ScriptResult:
+    """Run one script with pylox.run_path(), capturing its output."""
+    stdout, stderr = io.StringIO(), io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            errors, runtime_errors = pylox.run_path(path, options)
+            status = 65 if errors else 70 if runtime_errors else 0
+        except OSError as error:
+            print(f'{path}: {error.strerror}', file=sys.stderr)
+            status = 1
+        except Exception:
+            traceback.print_exc()
+            status = 1
+    return ScriptResult(path, status, stdout.getvalue(), stderr.getvalue(),
+                        time.perf_counter() - start)
+
+
+def run_batch(scripts: List[str], jobs: int = None,
+              options: pylox.Options = None):
+    """
+    Run scripts on a pool of jobs worker processes (one per CPU by default),
+    generating a ScriptResult for each, in order.
+
+    Workers are started once and run many scripts each, so the cost of
+    starting Python and importing pylox is paid per worker, not per script.
+    With one job, scripts run in this process.
+    """
+    options = options or pylox.Options()
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(scripts) < 2:
+        for path in scripts:
+            yield run_script(path, options)
+        return
+
+    # Enough scripts per task to amortize sending them, few enough that
+    # workers finish at about the same time.
+    chunksize = max(1, len(scripts) // (jobs * 8))
+    with multiprocessing.Pool(jobs) as pool:
+        yield from pool.imap(run_script_with, [(path, options)
+                                               for path in scripts],
+                             chunksize)
+
+
+def run_script_with(arguments) -> ScriptResult:
+    return run_script(*arguments)
+
+
+def main(targets: List[str], jobs: int = None,
+         options: pylox.Options = None, summary_json: str = None) -> int:
+    """
+    Run the scripts found in targets, copying each one's stdout and stderr
+    to ours, a script at a time, then print a summary on stderr. Returns
+    the exit status for the batch: 0 if every script succeeded, else 1.
+    """
+    scripts = find_scripts(targets)
+    start = time.perf_counter()
+    results = []
+    for result in run_batch(scripts, jobs, options):
+        sys.stdout.write(result.stdout)
+        sys.stdout.flush()
+        sys.stderr.write(result.stderr)
+        print(f'[batch] {result.path}: exit {result.status} '
+              f'({result.seconds:.3f}s)', file=sys.stderr)
+        results.append(result)
+    elapsed = time.perf_counter() - start
+
+    counts = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+    statuses = ', '.join(f'{count} exited {status}'
+                         for status, count in sorted(counts.items()))
+    print(f'[batch] {len(results)} scripts in {elapsed:.3f}s: '
+          f'{statuses or "none run"}', file=sys.stderr)
+
+    if summary_json is not None:
+        with open(summary_json, 'w') as file:
+            json.dump({'seconds': elapsed, 'counts': counts,
+                       'scripts': [result.as_json() for result in results]},
+                      file, indent=2)
+            file.write('\n')
+    return 0 if all(result.status == 0 for result in results) else 1
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Compare the tree and adaptive interpreters on statements run many times.
+
+Lox has no loops, so each node of a program runs once per run and only
+statements run again and again, as here, give nodes time to specialize.
+Each workload is parsed once and run --runs times (20 by default) by one
+interpreter of each kind, checking they print the same, and the first
+and the fastest run are reported; the adaptive interpreter's report
+follows. Then the same expressions are run with globals whose types
+change between runs, which must deoptimize the nodes and still print
+what the tree interpreter does, errors included.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import workloads
+from adaptive import AdaptiveInterpreter
+from interpreter import Interpreter
+from output import ListOutput
+from parser import Parser
+from pylox import Scanner
+
+interpreters = {
+    'tree':         Interpreter,
+    'adaptive':     AdaptiveInterpreter,
+}
+
+
+def parse(source):
+    return Parser(Scanner(source).scan_tokens()).parse()
+
+
+def run(interpreter, statements):
+    interpreter.output.lines.clear()
+    interpreter.errors.clear()
+    interpreter.interpret(statements)
+    errors = [error.report() for error in interpreter.errors]
+    return list(interpreter.output.lines), errors
+
+
+def main(argv):
+    arg_parser = argparse.ArgumentParser(prog=argv[0], description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--runs', type=int, default=20,
+                            help='run each workload this many times '
+                                 '(default: %(default)s)')
+    args = arg_parser.parse_args(argv[1:])
+
+    for name, source in [('arithmetic', workloads.arithmetic(500)),
+                         ('concatenation', workloads.concatenation(500))]:
+        statements = parse(source)
+        results = {}
+        for engine, cls in interpreters.items():
+            interpreter = cls(ListOutput())
+            start = time.perf_counter()
+            first = run(interpreter, statements)
+            once = best = time.perf_counter() - start
+            for _ in range(args.runs - 1):
+                start = time.perf_counter()
+                assert run(interpreter, statements) == first, (name, engine)
+                best = min(best, time.perf_counter() - start)
+            results[engine] = first
+            print(f'{name:14} {engine:10} first run {once:8.4f}s, '
+                  f'best run {best:8.4f}s')
+        assert results['tree'] == results['adaptive'], name
+        interpreter.report(sys.stdout, limit=5)
+
+    # Each prelude redefines a and b, then the same expressions run again.
+    expressions = parse('print a + b; print a < b; print -a; print !b; '
+                        'print a == b;')
+    preludes = ['var a = 1; var b = 2;'] * 5 + [
+        'var a = "x"; var b = "y";',
+        'var a = 1; var b = 2;',
+        'var a = nil; var b = false;',
+        'var a = 1; var b = "y";',
+    ] * 3
+    results = {}
+    for engine, cls in interpreters.items():
+        interpreter = cls(ListOutput())
+        results[engine] = [(run(interpreter, parse(prelude)),
+                            run(interpreter, expressions))
+                           for prelude in preludes]
+    assert results['tree'] == results['adaptive']
+    misses = sum(item.misses for item in interpreter.feedback)
+    assert misses > 0
+    print(f'changing types: {len(preludes)} runs agree, {misses} misses')
+    interpreter.report(sys.stdout)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
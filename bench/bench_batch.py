@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Compare a pylox.py process per script with pylox.py --batch.
+
+Writes --scripts small scripts to a temporary directory, runs each with
+its own `pylox.py script`, then runs them all with --batch for 1, 2, ...
+jobs up to the number of CPUs.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import workloads
+
+PYLOX = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                     'pylox.py')
+
+
+def timed(command):
+    start = time.perf_counter()
+    subprocess.run(command, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL, check=False)
+    return time.perf_counter() - start
+
+
+def main(argv):
+    arg_parser = argparse.ArgumentParser(prog=argv[0], description=__doc__)
+    arg_parser.add_argument('--scripts', type=int, default=200)
+    arg_parser.add_argument('--size', type=int, default=200,
+                            help='arithmetic statements per script')
+    args = arg_parser.parse_args(argv[1:])
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for i in range(args.scripts):
+            path = os.path.join(directory, f'script{i:05}.lox')
+            with open(path, 'w') as file:
+                file.write(workloads.arithmetic(args.size))
+            paths.append(path)
+
+        elapsed = sum(timed([sys.executable, PYLOX, '--no-cache', path])
+                      for path in paths)
+        print(f'{"process each":16} {elapsed:8.3f}s '
+              f'{args.scripts / elapsed:10,.1f} scripts/s')
+
+        jobs = 1
+        while jobs <= (os.cpu_count() or 1):
+            elapsed = timed([sys.executable, PYLOX, '--no-cache',
+                             '--batch', directory, '-j', str(jobs)])
+            print(f'{"--batch -j " + str(jobs):16} {elapsed:8.3f}s '
+                  f'{args.scripts / elapsed:10,.1f} scripts/s')
+            jobs *= 2
+
+
+if __name__ == '__main__':
+    main(sys.argv)
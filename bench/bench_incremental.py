@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Compare incremental reparsing of edits with scanning and parsing again.
+
+Applies random edits to a Document for a 10,000 line script (or argv[1]
+lines) and reports the latency of Document.edit() next to that of a full
+scan and parse of the edited source by an ArrayScanner and an ArrayParser.
+After every edit, the Document's tokens, statements and errors are checked
+against the full parse.
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import workloads
+from incremental import Document
+from parser import ArrayParser
+from pylox import ArrayScanner
+
+
+# What an edit inserts: typing, pasting lines, and the characters that
+# change how everything after them scans or parses.
+snippets = ['a', '1', '.', ' ', '\n', ';', '+', '=', '(', ')', '{', '}', '"',
+            '//', 'var x = 1;\n', 'print "é\n";\n', 'x = x + 1;']
+
+
+def full_parse(source):
+    scanner = ArrayScanner(source)
+    tokens = scanner.scan_tokens()
+    parser = ArrayParser(tokens)
+    statements = parser.parse()
+    return tokens, statements, scanner.errors + parser.errors
+
+
+def check(document, tokens, statements, errors):
+    for name in ('kinds', 'starts', 'ends', 'lines'):
+        assert getattr(document.tokens, name) == getattr(tokens, name), name
+    assert repr(document.statements) == repr(statements), 'statements'
+    assert ([error.report() for error in document.errors]
+            == [error.report() for error in errors]), 'errors'
+
+
+def main(argv):
+    lines = int(argv[1]) if len(argv) > 1 else 10_000
+    edits = int(argv[2]) if len(argv) > 2 else 200
+    rng = random.Random(0)
+    document = Document(workloads.mixed(lines))
+    print(f'{len(document.source) / 1e6:.1f} MB, {lines} lines, '
+          f'{len(document.tokens)} tokens, '
+          f'{len(document.declarations)} declarations')
+
+    incremental, full, rescanned, reparsed = [], [], [], []
+    for _ in range(edits):
+        offset = rng.randrange(len(document.source))
+        removed = rng.choice([0, 0, 1, rng.randrange(20)])
+        removed = min(removed, len(document.source) - offset)
+        inserted = rng.choice(snippets) if rng.random() < 0.8 else ''
+
+        start = time.perf_counter()
+        document.edit(offset, removed, inserted)
+        incremental.append(time.perf_counter() - start)
+        rescanned.append(document.rescanned)
+        reparsed.append(document.reparsed)
+
+        start = time.perf_counter()
+        result = full_parse(document.source)
+        full.append(time.perf_counter() - start)
+        check(document, *result)
+
+    for name, times in [('incremental', incremental), ('full', full)]:
+        print(f'{name:12} median {statistics.median(times) * 1e3:8.2f} ms, '
+              f'mean {statistics.mean(times) * 1e3:8.2f} ms, '
+              f'max {max(times) * 1e3:8.2f} ms')
+    print(f'per edit: median {statistics.median(rescanned)} tokens rescanned, '
+          f'{statistics.median(reparsed)} declarations reparsed')
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Compare the tree and iterative interpreters, and run very deep nesting.
+
+Times both interpreters (best of 3) on the arithmetic and nested_blocks workloads,
+checking they print the same. Then runs programs nested 100,000 deep (or
+argv[1]): a left-leaning chain of additions, parentheses, negations and
+blocks, each run through pylox.run() with the array scanner and the
+Pratt parser, with and without -O. The iterative interpreter must run
+each and print the expected value; the tree interpreter is expected to
+hit RecursionError, unless folding has left it nothing deep to run.
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pylox
+import workloads
+from interpreter import Interpreter
+from iterative import IterativeInterpreter
+from output import ListOutput
+from parser import ArrayPrattParser
+from pylox import ArrayScanner
+
+interpreters = {
+    'tree':         Interpreter,
+    'iterative':    IterativeInterpreter,
+}
+
+
+def parse(source):
+    return ArrayPrattParser(ArrayScanner(source).scan_tokens()).parse()
+
+
+def run(cls, statements):
+    interpreter = cls(ListOutput())
+    start = time.perf_counter()
+    interpreter.interpret(statements)
+    elapsed = time.perf_counter() - start
+    # Blocks left by an error must have restored the environment.
+    assert interpreter.environment is interpreter.globals
+    errors = [error.report() for error in interpreter.errors]
+    return (interpreter.output.lines, errors), elapsed
+
+
+def deep_programs(depth):
+    return {
+        'additions':    (f'print {"1 + " * depth}1;', [str(depth + 1)]),
+        'parentheses':  (f'print {"(" * depth}1{")" * depth};', ['1']),
+        'negations':    (f'print {"-" * depth}1;',
+                         ['-1' if depth % 2 else '1']),
+        # Blocks nested depth deep, with a runtime error at the bottom.
+        'blocks':       ('{' * depth + 'print "deep"; print -"x";'
+                         + '}' * depth, ['deep']),
+    }
+
+
+def run_source(engine, source, optimize):
+    output = ListOutput()
+    start = time.perf_counter()
+    # run() prints errors as well as returning them.
+    with contextlib.redirect_stderr(io.StringIO()):
+        errors, runtime_errors = pylox.run(source, pylox.Options(
+            engine=engine, optimize=optimize, scanner='array',
+            output=output, parser='pratt'))
+    elapsed = time.perf_counter() - start
+    assert not errors, errors
+    errors = [error.report() for error in runtime_errors]
+    return (output.lines, errors), elapsed
+
+
+def main(argv):
+    depth = int(argv[1]) if len(argv) > 1 else 100_000
+    for name, source in [('arithmetic', workloads.arithmetic(5_000)),
+                         ('nested_blocks',
+                          workloads.nested_blocks(2_000, depth=20))]:
+        results = {}
+        for engine, cls in interpreters.items():
+            # Best of 3, each on freshly parsed statements.
+            elapsed = min(run(cls, parse(source))[1] for _ in range(3))
+            results[engine] = run(cls, parse(source))[0]
+            print(f'{name:14} {engine:10} {elapsed:8.3f}s')
+        assert results['tree'] == results['iterative'], name
+
+    for name, (source, expected) in deep_programs(depth).items():
+        for optimize in (0, 1):
+            for engine in interpreters:
+                label = f'{name:14} {engine:10} -O{optimize}'
+                try:
+                    (lines, errors), elapsed = run_source(engine, source,
+                                                          optimize)
+                except RecursionError:
+                    print(f'{label} RecursionError')
+                    continue
+                assert lines == expected, (name, engine, optimize, lines)
+                print(f'{label} {elapsed:8.3f}s {errors}')
+
+
+if __name__ == '__main__':
+    main(sys.argv)
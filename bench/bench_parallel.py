@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""Compare scanning a large script in one process and in chunks on a pool.
+
+Generates a script of about 20 MB (or argv[1] MB) and scans it with an
+ArrayScanner, then with parallel.scan() for 1, 2, 4, ... jobs up to the
+number of CPUs, checking that every run gives the same tokens. Parsing
+the tokens takes the same time either way and isn't timed.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parallel
+import workloads
+from pylox import ArrayScanner
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main(argv):
+    megabytes = float(argv[1]) if len(argv) > 1 else 20
+    chunk = workloads.mixed(100_000)
+    source = chunk * max(1, round(megabytes * 1e6 / len(chunk)))
+
+    scanner = ArrayScanner(source)
+    expected, elapsed = timed(scanner.scan_tokens)
+    print(f'{"serial":10} {elapsed:8.3f}s {len(expected):12,} tokens')
+
+    jobs = 1
+    while jobs <= (os.cpu_count() or 1):
+        (tokens, errors), elapsed = timed(parallel.scan, source, jobs)
+        assert (tokens.kinds, tokens.starts, tokens.ends, tokens.lines) == (
+            expected.kinds, expected.starts, expected.ends, expected.lines)
+        print(f'{"-j " + str(jobs):10} {elapsed:8.3f}s')
+        jobs *= 2
+
+
+if __name__ == '__main__':
+    main(sys.argv)
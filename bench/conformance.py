@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Check that every execution engine agrees with the tree-walker.
+
+Runs random programs through each engine, with and without constant
+folding, and compares what they print and the runtime errors they report
+against the unoptimized tree-walker. Exits non-zero on the first
+disagreement.
+"""
+
+import contextlib
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import workloads
+from optimizer import ConstantFolder
+from parser import Parser
+from pylox import Scanner, engines
+
+
+def execute(engine, source, optimize=0):
+    program = Parser(Scanner(source).scan_tokens()).parse()
+    if optimize:
+        ConstantFolder().fold(program)
+    interpreter = engine()
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        interpreter.interpret(program)
+    return output.getvalue(), [error.report() for error in interpreter.errors]
+
+
+def main(argv):
+    programs = int(argv[1]) if len(argv) > 1 else 500
+    for seed in range(programs):
+        source = workloads.random_program(seed)
+        reference = execute(engines['tree'], source)
+        for name, engine in engines.items():
+            for optimize in (0, 1):
+                result = execute(engine, source, optimize)
+                if result != reference:
+                    print(f'{name} -O{optimize} disagrees with tree '
+                          f'on seed {seed}:')
+                    print(source)
+                    print(f'tree:  {reference!r}')
+                    print(f'{name}: {result!r}')
+                    return 1
+    print(f'{len(engines)} engines agree on {programs} programs '
+          f'with and without folding')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Compare execution time and output of the execution engines.
+
+Each engine runs a freshly parsed copy of an expression-heavy script. The
+time includes any resolving or compiling the engine does first.
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import workloads
+from closures import ClosureCompiler
+from codegen import CompilingGenerator, PythonInterpreter
+from interpreter import GlobalEnvironment, gc_paused
+from parser import Parser
+from pylox import Scanner, engines
+from resolver import Resolver
+from vm import VM, Compiler
+
+
+def parse(source):
+    return Parser(Scanner(source).scan_tokens()).parse()
+
+
+def main(argv):
+    statements = int(argv[1]) if len(argv) > 1 else 5_000
+    source = workloads.arithmetic(statements)
+
+    outputs = {}
+    for name, engine in engines.items():
+        program = parse(source)
+        interpreter = engine()
+        output = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            interpreter.interpret(program)
+        elapsed = time.perf_counter() - start
+        errors = [error.report() for error in interpreter.errors]
+        outputs[name] = output.getvalue(), errors
+        print(f'{name:8} {elapsed:.3f}s')
+
+    reference = outputs.pop('tree')
+    for name, output in outputs.items():
+        assert output == reference, f'{name} output differs'
+
+    # Compiled engines pay off when compiled code runs more than once.
+    for name, compile, execute in [
+            ('closure', compile_closures, execute_closures),
+            ('vm', compile_bytecode, execute_bytecode),
+            ('python', compile_python, execute_python)]:
+        program = parse(source)
+        Resolver().resolve(program)
+        globals = GlobalEnvironment()
+        start = time.perf_counter()
+        with gc_paused():
+            compiled = compile(program, globals)
+        compiled_at = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            execute(compiled, globals)
+        executed_at = time.perf_counter()
+        print(f'{name:8} compile {compiled_at - start:.3f}s, '
+              f'execute {executed_at - compiled_at:.3f}s')
+
+
+def compile_closures(program, globals):
+    return [ClosureCompiler(globals).compile(s) for s in program]
+
+
+def execute_closures(compiled, globals):
+    for statement in compiled:
+        statement(globals)
+
+
+def compile_bytecode(program, globals):
+    return Compiler().compile(program)
+
+
+def execute_bytecode(chunk, globals):
+    vm = VM()
+    vm.globals = globals
+    vm.run(chunk)
+
+
+def compile_python(program, globals):
+    generator = CompilingGenerator()
+    generator.translate(program)
+    return generator.finished
+
+
+def execute_python(functions, globals):
+    interpreter = PythonInterpreter()
+    interpreter.globals = globals
+    interpreter.interpret_compiled(functions)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
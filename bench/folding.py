@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Measure constant folding on a script of literal expressions.
+
+Times the folding pass itself, then each engine running the script with
+and without it. The time includes any resolving or compiling the engine
+does first.
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import workloads
+from optimizer import ConstantFolder
+from parser import Parser
+from pylox import Scanner, engines
+
+
+def parse(source):
+    return Parser(Scanner(source).scan_tokens()).parse()
+
+
+def main(argv):
+    statements = int(argv[1]) if len(argv) > 1 else 2_000
+    source = workloads.literals(statements)
+
+    program = parse(source)
+    folder = ConstantFolder()
+    start = time.perf_counter()
+    folder.fold(program)
+    elapsed = time.perf_counter() - start
+    print(f'fold     {elapsed:.3f}s, {folder.folded} nodes folded')
+
+    for name, engine in engines.items():
+        timings = []
+        for optimize in (0, 1):
+            program = parse(source)
+            if optimize:
+                ConstantFolder().fold(program)
+            interpreter = engine()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                interpreter.interpret(program)
+            timings.append(time.perf_counter() - start)
+        print(f'{name:8} -O0 {timings[0]:.3f}s, -O1 {timings[1]:.3f}s')
+
+
+if __name__ == '__main__':
+    main(sys.argv)
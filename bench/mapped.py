@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Compare scanning a large script read into a str with scanning an mmap.
+
+Writes a generated script of about 100 MB (or argv[1] MB) to a temporary
+file, then scans it both ways, each in a fresh process: reading the file
+as text and running an ArrayScanner over the str, as run_file does, and
+mapping it and running a MappedScanner over the bytes, as --mmap does.
+Reports the time to read and scan, the peak Python heap (per tracemalloc,
+which sees the str but not the mapping) and the peak resident set size.
+"""
+
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import workloads
+from pylox import ArrayScanner, MappedScanner, map_file
+
+
+def generate(path, megabytes):
+    chunk = workloads.mixed(100_000)
+    with open(path, 'w', encoding='utf-8') as file:
+        # Exercise UTF-8 inside string literals.
+        file.write('var greeting = "héllo wörld ☃";\n')
+        for _ in range(max(1, round(megabytes * 1e6 / len(chunk)))):
+            file.write(chunk)
+
+
+def scan_text(path):
+    with open(path, encoding='utf-8') as file:
+        scanner = ArrayScanner(file.read())
+    return scanner.scan_tokens()
+
+
+def scan_mapped(path):
+    with map_file(path) as mapping:
+        tokens = MappedScanner(mapping).scan_tokens()
+        # Check a lexeme, then let go of the mapping so it can be closed.
+        tokens.lexeme(3)
+        tokens.source = None
+    return tokens
+
+
+def measure(mode, path):
+    scan = {'text': scan_text, 'mapped': scan_mapped}[mode]
+    start = time.perf_counter()
+    tokens = scan(path)
+    elapsed = time.perf_counter() - start
+    count = len(tokens)
+    del tokens
+
+    tracemalloc.start()
+    tokens = scan(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del tokens
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    print(f'{mode:8} {elapsed:7.3f}s, {count:,} tokens, '
+          f'heap peak {peak / 1e6:7.1f} MB, max RSS {rss / 1e6:7.1f} MB')
+
+
+def main(argv):
+    if len(argv) == 3:
+        measure(argv[1], argv[2])
+        return
+
+    megabytes = float(argv[1]) if len(argv) > 1 else 100
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'big.lox')
+        generate(path, megabytes)
+        print(f'{os.path.getsize(path) / 1e6:.1f} MB script')
+        for mode in ('text', 'mapped'):
+            subprocess.run([sys.executable, __file__, mode, path], check=True)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
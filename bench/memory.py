@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Measure the memory used by tokens and AST nodes for a large script.
+
+Reports the bytes allocated (per tracemalloc) while scanning, per token, and
+while parsing, per node. The source string and token list themselves are
+excluded, only the objects that hold the program are counted.
+"""
+
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import workloads
+from expr import Expr
+from parser import Parser
+from pylox import Scanner
+from stmt import Stmt
+
+
+def count_nodes(statements):
+    count = 0
+    nodes = list(statements)
+    while nodes:
+        node = nodes.pop()
+        count += 1
+        for name in node._fields:
+            value = getattr(node, name)
+            if isinstance(value, list):
+                nodes.extend(value)
+            elif isinstance(value, (Expr, Stmt)):
+                nodes.append(value)
+    return count
+
+
+def main(argv):
+    statements = int(argv[1]) if len(argv) > 1 else 20_000
+    source = workloads.arithmetic(statements)
+    gc.collect()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tokens = Scanner(source).scan_tokens()
+    scanned = tracemalloc.get_traced_memory()[0]
+    statements = Parser(tokens).parse()
+    parsed = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # The list holding the tokens isn't part of any token.
+    token_bytes = scanned - before - sys.getsizeof(tokens)
+    nodes = count_nodes(statements)
+    print(f'{len(tokens)} tokens, {token_bytes / len(tokens):.1f} bytes/token')
+    print(f'{nodes} nodes, {(parsed - scanned) / nodes:.1f} bytes/node')
+    print(f'{(parsed - before) / len(source):.1f} bytes per source byte')
+
+
+if __name__ == '__main__':
+    main(sys.argv)
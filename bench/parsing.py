@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Compare the parsers' throughput, and check deep nesting.
+
+Parses each workload with every parser in pylox.parsers, over a list of
+Tokens and over a TokenArray, reporting tokens/second (best of 3) and
+checking every parser builds the same tree. Then parses expressions
+nested 100,000 deep (or argv[1]) in parentheses, prefix operators and
+assignments, which the Pratt parser must handle and the recursive one
+can't.
+"""
+
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import workloads
+from expr import Expr
+from interpreter import gc_paused
+from pylox import ArrayScanner, Scanner, parsers
+from stmt import Stmt
+from tokens import Token
+
+
+def best_time(function, repeat=3):
+    # Like timeit, keep the collector out of the timings: otherwise they
+    # depend on whether a full collection, which traverses every tree kept
+    # so far, happens to fall within the parse.
+    best = None
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        with gc_paused():
+            start = time.perf_counter()
+            result = function()
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def shape(node):
+    """Return node as nested tuples, to compare trees."""
+    if isinstance(node, Token):
+        return node.type, node.lexeme, node.literal, node.line
+    if isinstance(node, list):
+        return tuple(shape(child) for child in node)
+    if isinstance(node, (Expr, Stmt)):
+        return (type(node).__name__,) + tuple(shape(getattr(node, name))
+                                              for name in node._fields)
+    return node
+
+
+def nested(depth):
+    return (f'print {"(" * depth}1{")" * depth};\n'
+            f'print {"-" * depth}1;\n'
+            f'var a = {"a = " * depth}1;\n')
+
+
+def main(argv):
+    depth = int(argv[1]) if len(argv) > 1 else 100_000
+    sources = {
+        'mixed':        workloads.mixed(20_000),
+        'arithmetic':   workloads.arithmetic(2_000),
+        'literals':     workloads.literals(2_000),
+    }
+    for name, source in sources.items():
+        token_list = Scanner(source).scan_tokens()
+        token_array = ArrayScanner(source).scan_tokens()
+        trees = set()
+        for parser, (token_parser, array_parser) in parsers.items():
+            for kind, cls, tokens in (('tokens', token_parser, token_list),
+                                      ('array', array_parser, token_array)):
+                statements, elapsed = best_time(lambda: cls(tokens).parse())
+                trees.add(shape(statements))
+                print(f'{name:12} {parser:10} {kind:7} '
+                      f'{len(tokens) / elapsed:12,.0f} tokens/s')
+        assert len(trees) == 1, f'{name}: the parsers disagree'
+
+    source = nested(depth)
+    for parser, (_, array_parser) in parsers.items():
+        try:
+            statements, elapsed = best_time(
+                lambda: array_parser(ArrayScanner(source).scan_tokens())
+                .parse(), 1)
+        except RecursionError:
+            print(f'nested {depth:<8} {parser:10} RecursionError')
+        else:
+            print(f'nested {depth:<8} {parser:10} {elapsed:8.3f}s '
+                  f'{len(statements)} statements')
+
+
+if __name__ == '__main__':
+    main(sys.argv)
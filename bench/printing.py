@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Compare the throughput of print-heavy scripts with each output sink.
+
+Parses a script of 200,000 (or argv[1]) print statements once, then times
+each engine executing it with stdout printed line by line (the default),
+buffered, written straight to the file descriptor, and kept in a list.
+stdout is a pipe, drained by a thread.
+"""
+
+import contextlib
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import workloads
+from output import (BufferedOutput, FileDescriptorOutput, ListOutput,
+                    StdoutOutput)
+from pylox import engines, execute, parse
+
+
+def main(argv):
+    lines = int(argv[1]) if len(argv) > 1 else 200_000
+    source = workloads.prints(lines)
+
+    read_end, write_end = os.pipe()
+    drain = threading.Thread(target=lambda: drain_pipe(read_end))
+    drain.start()
+    with open(write_end, 'w') as stdout:
+        sinks = {
+            'print':    StdoutOutput,
+            'buffered': BufferedOutput,
+            'fd':       lambda: FileDescriptorOutput(stdout.fileno()),
+            'list':     ListOutput,
+        }
+        for engine in engines:
+            for name, sink in sinks.items():
+                statements, _ = parse(source)
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(stdout):
+                    execute(statements, engine, sink())
+                    stdout.flush()
+                elapsed = time.perf_counter() - start
+                print(f'{engine:8} {name:8} {elapsed:7.3f}s '
+                      f'({lines / elapsed:10,.0f} lines/s)')
+    drain.join()
+
+
+def drain_pipe(fd):
+    with open(fd, 'rb') as pipe:
+        while pipe.read(1 << 16):
+            pass
+
+
+if __name__ == '__main__':
+    main(sys.argv)
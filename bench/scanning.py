@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Compare the scanners' speed, memory and output.
+
+For each scanner, reports tokens/second, the memory its tokens hold (per
+tracemalloc, measured in a separate run since tracing slows scanning), and
+the time to scan and parse together.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import workloads
+from parser import ArrayParser, Parser
+from pylox import scanners
+from tokens import TokenArray
+
+
+def key(token):
+    return token.type, token.lexeme, token.literal, token.line
+
+
+def parser_for(tokens):
+    if isinstance(tokens, TokenArray):
+        return ArrayParser(tokens)
+    return Parser(tokens)
+
+
+def main(argv):
+    lines = int(argv[1]) if len(argv) > 1 else 100_000
+    source = workloads.mixed(lines)
+    print(f'{len(source) / 1e6:.1f} MB, {lines} lines')
+
+    results = {}
+    for name, cls in scanners.items():
+        scanner = cls(source)
+        start = time.perf_counter()
+        tokens = scanner.scan_tokens()
+        elapsed = time.perf_counter() - start
+        count = len(tokens)
+        results[name] = ([key(t) for t in tokens],
+                         [e.report() for e in scanner.errors])
+
+        start = time.perf_counter()
+        parser_for(tokens).parse()
+        parsed = time.perf_counter() - start
+
+        del tokens, scanner
+        tracemalloc.start()
+        tokens = cls(source).scan_tokens()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del tokens
+
+        print(f'{name:8} {count / elapsed:12,.0f} tokens/s ({elapsed:.3f}s), '
+              f'{size / 1e6:6.1f} MB ({size / count:5.1f} bytes/token), '
+              f'scan+parse {elapsed + parsed:.3f}s')
+
+    reference = results.pop('classic')
+    for name, result in results.items():
+        assert result == reference, f'{name} scanner output differs'
+
+
+if __name__ == '__main__':
+    main(sys.argv)
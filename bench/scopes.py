@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""Time resolving and interpreting example.lox style scoping, scaled up."""
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import workloads
+from interpreter import Interpreter
+from parser import Parser
+from pylox import Scanner
+from resolver import Resolver
+
+
+def main(argv):
+    copies = int(argv[1]) if len(argv) > 1 else 2_000
+    for depth in (2, 8, 32):
+        source = workloads.nested_blocks(copies, depth)
+        statements = Parser(Scanner(source).scan_tokens()).parse()
+
+        start = time.perf_counter()
+        Resolver().resolve(statements)
+        resolved = time.perf_counter()
+
+        interpreter = Interpreter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for statement in statements:
+                interpreter.execute(statement)
+        executed = time.perf_counter()
+
+        print(f'depth {depth:3}: resolve {resolved - start:.3f}s, '
+              f'execute {executed - resolved:.3f}s')
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Compare running snippets with run() and with a warm Session.
+
+A service-like workload: a small set of distinct snippets, each run many
+times against shared globals. run() scans, parses and builds a fresh
+interpreter for every snippet, Session.run() reuses its interpreter and what
+it compiled a snippet to the first time.
+"""
+
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pylox import Session, engines, run
+
+
+def snippets(count, seed=0):
+    rng = random.Random(seed)
+    out = []
+    for i in range(count):
+        terms = ' + '.join(str(rng.randrange(100)) for _ in range(5))
+        out.append(f'{{ var t = {terms}; print t * {i} - counter; }}')
+    return out
+
+
+def main(argv):
+    runs = int(argv[1]) if len(argv) > 1 else 20_000
+    distinct = snippets(50)
+    rng = random.Random(1)
+    workload = [rng.choice(distinct) for _ in range(runs)]
+
+    # run() has no globals to share, so declare counter in every snippet.
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), \
+            contextlib.redirect_stderr(io.StringIO()):
+        for source in workload:
+            run('var counter = 1;' + source)
+    elapsed = time.perf_counter() - start
+    print(f'{"run()":16} {runs / elapsed:10,.0f} snippets/s')
+
+    for engine in engines:
+        session = Session(engine=engine)
+        session.run('var counter = 1;')
+        start = time.perf_counter()
+        for source in workload:
+            session.run(source)
+        elapsed = time.perf_counter() - start
+        print(f'{"Session " + engine:16} {runs / elapsed:10,.0f} snippets/s '
+              f'({session.hits} cache hits, {session.misses} misses)')
+
+
+if __name__ == '__main__':
+    main(sys.argv)
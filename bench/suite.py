@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""Time scanning, parsing and interpreting each workload, with regressions.
+
+For every workload, times Scanner.scan_tokens(), Parser.parse() and
+Interpreter.interpret() separately (best of --repeat runs), reports each
+phase's throughput and peak memory (per tracemalloc, in a separate run),
+and writes the results as JSON with --output.
+
+Given a --baseline written by an earlier run, exits with status 1 if any
+phase of any workload got slower by more than --threshold (a fraction of
+the baseline time, 0.10 by default).
+
+    bench/suite.py --output baseline.json
+    ... change things ...
+    bench/suite.py --baseline baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import workloads
+from interpreter import Interpreter
+from memory import count_nodes
+from output import ListOutput
+from parser import Parser
+from pylox import Scanner
+
+
+def suite(scale):
+    """Return the workloads by name, scale times their default size."""
+    def n(count):
+        return max(1, int(count * scale))
+
+    parts = {
+        'nested_blocks':    workloads.nested_blocks(n(200), depth=20),
+        'arithmetic':       workloads.arithmetic(n(2_000)),
+        'many_globals':     workloads.many_globals(n(5_000)),
+        'concatenation':    workloads.concatenation(n(2_000)),
+        'prints':           workloads.prints(n(20_000)),
+    }
+    # All of them, five times over.
+    parts['large'] = ''.join(parts.values()) * 5
+    return parts
+
+
+def scan(source):
+    return Scanner(source).scan_tokens()
+
+
+def parse(tokens):
+    return Parser(tokens).parse()
+
+
+def interpret(statements):
+    interpreter = Interpreter(ListOutput())
+    interpreter.interpret(statements)
+    assert not interpreter.errors, interpreter.errors[0].report()
+
+
+def best_time(function, argument, repeat):
+    """Return the result of the last call and the fastest time."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(argument)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def peak_memory(function, argument):
+    tracemalloc.start()
+    try:
+        function(argument)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(source, repeat, memory):
+    tokens, scan_time = best_time(scan, source, repeat)
+    statements, parse_time = best_time(parse, tokens, repeat)
+    nodes = count_nodes(statements)
+    # Each run needs freshly parsed statements, the interpreter annotates
+    # them while resolving.
+    interpret_time = min(best_time(interpret, parse(tokens), 1)[1]
+                         for _ in range(repeat))
+
+    phases = {
+        'scan': {'seconds': scan_time, 'items': len(tokens),
+                 'unit': 'tokens'},
+        'parse': {'seconds': parse_time, 'items': len(tokens),
+                  'unit': 'tokens'},
+        'interpret': {'seconds': interpret_time, 'items': nodes,
+                      'unit': 'nodes'},
+    }
+    if memory:
+        phases['scan']['peak_memory'] = peak_memory(scan, source)
+        phases['parse']['peak_memory'] = peak_memory(parse, tokens)
+        phases['interpret']['peak_memory'] = peak_memory(interpret,
+                                                         parse(tokens))
+    for phase in phases.values():
+        phase['throughput'] = phase['items'] / phase['seconds']
+    return {'bytes': len(source.encode('utf-8')), 'phases': phases}
+
+
+def compare(results, baseline, threshold):
+    """Print and return the phases that regressed beyond threshold."""
+    regressions = []
+    for name, workload in results['workloads'].items():
+        before = baseline['workloads'].get(name)
+        if before is None:
+            continue
+        for phase, stats in workload['phases'].items():
+            if phase not in before['phases']:
+                continue
+            old = before['phases'][phase]['seconds']
+            change = stats['seconds'] / old - 1
+            if change > threshold:
+                regressions.append((name, phase, old, stats['seconds'],
+                                    change))
+    for name, phase, old, new, change in regressions:
+        print(f'REGRESSION {name} {phase}: {old:.4f}s -> {new:.4f}s '
+              f'({change:+.1%})')
+    return regressions
+
+
+def main(argv):
+    arg_parser = argparse.ArgumentParser(prog=argv[0], description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--scale', type=float, default=1.0,
+                            help='multiply every workload size by this')
+    arg_parser.add_argument('--repeat', type=int, default=3,
+                            help='time each phase this many times and keep '
+                                 'the fastest (default: %(default)s)')
+    arg_parser.add_argument('--workload', action='append',
+                            help='only run this workload (repeatable)')
+    arg_parser.add_argument('--no-memory', dest='memory',
+                            action='store_false',
+                            help='skip the tracemalloc runs')
+    arg_parser.add_argument('--output', metavar='FILE',
+                            help='write the results to FILE as JSON')
+    arg_parser.add_argument('--baseline', metavar='FILE',
+                            help='compare with results saved by --output')
+    arg_parser.add_argument('--threshold', type=float, default=0.10,
+                            help='the slowdown, as a fraction, that counts '
+                                 'as a regression (default: %(default)s)')
+    args = arg_parser.parse_args(argv[1:])
+
+    results = {
+        'python': platform.python_version(),
+        'scale': args.scale,
+        'workloads': {},
+    }
+    print(f'{"workload":14} {"phase":10} {"seconds":>9} '
+          f'{"throughput":>20} {"peak memory":>12}')
+    for name, source in suite(args.scale).items():
+        if args.workload and name not in args.workload:
+            continue
+        workload = measure(source, args.repeat, args.memory)
+        results['workloads'][name] = workload
+        for phase, stats in workload['phases'].items():
+            memory = stats.get('peak_memory')
+            memory = '' if memory is None else f'{memory / 1e6:9.1f} MB'
+            throughput = f'{stats["throughput"]:,.0f} {stats["unit"]}/s'
+            print(f'{name:14} {phase:10} {stats["seconds"]:9.4f} '
+                  f'{throughput:>20} {memory:>12}')
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+            file.write('\n')
+
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if compare(results, baseline, args.threshold):
+            return 1
+        print(f'no phase regressed by more than {args.threshold:.0%}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
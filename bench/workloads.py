@@ -0,0 +1,219 @@
+"""Generators for synthetic Lox workloads used by the benchmarks."""
+
+import random
+
+
+def mixed(lines: int, seed: int = 0):
+    """Return a script of roughly `lines` lines exercising every token kind."""
+    rng = random.Random(seed)
+    out = []
+    depth = 0
+    for i in range(lines):
+        indent = '  ' * depth
+        choice = rng.randrange(8)
+        if choice == 0 and depth < 8:
+            out.append(f'{indent}{{')
+            depth += 1
+        elif choice == 1 and depth > 0:
+            depth -= 1
+            out.append(f'{"  " * depth}}}')
+        elif choice == 2:
+            out.append(f'{indent}// comment number {i} with "quotes"')
+        elif choice == 3:
+            out.append(f'{indent}var s{i} = "string {i}" + "\\t literal";')
+        elif choice == 4:
+            out.append(f'{indent}var n{i} = {i}.5 * (3 - {i}) / 7 + 12;')
+        elif choice == 5:
+            out.append(f'{indent}print !(n >= {i}) == (n != {i}) and true;')
+        else:
+            out.append(f'{indent}var v{i} = nil; v{i} = -{i} <= {i};')
+    out.extend('}' * depth)
+    return '\n'.join(out) + '\n'
+
+
+def nested_blocks(copies: int, depth: int = 2):
+    """Return example.lox, repeated and nested `depth` blocks deep.
+
+    Like example.lox, each block shadows only some of the names and reads all
+    of them, so most reads resolve to an outer block or a global.
+    """
+    out = ['var a = "global a";', 'var b = "global b";', 'var c = "global c";']
+    for _ in range(copies):
+        for level in range(depth):
+            indent = '  ' * level
+            out.append(f'{indent}{{')
+            name = 'ab'[level % 2]
+            out.append(f'{indent}  var {name} = "{name}{level}";')
+        for level in reversed(range(depth + 1)):
+            indent = '  ' * level
+            out.append(f'{indent}print a; print b; print c;')
+            if level:
+                out.append(f'{"  " * (level - 1)}}}')
+    return '\n'.join(out) + '\n'
+
+
+def arithmetic(statements: int, terms: int = 20, seed: int = 0):
+    """Return a script of long arithmetic and comparison expressions."""
+    rng = random.Random(seed)
+    out = ['var a = 1.5;', 'var b = 2;', 'var c = 3;', '{']
+    out.append('  var x = 4; var y = 0.25;')
+    for _ in range(statements):
+        operands = [rng.choice(['a', 'b', 'c', 'x', 'y', '1', '2.5', '(a - b)'])
+                    for _ in range(terms)]
+        operators = [rng.choice(['+', '-', '*', '+']) for _ in range(terms - 1)]
+        expression = operands[0]
+        for operator, operand in zip(operators, operands[1:]):
+            expression += f' {operator} {operand}'
+        target = rng.choice(['x', 'y', 'print'])
+        if target == 'print':
+            out.append(f'  print {expression} < -{expression};')
+        else:
+            out.append(f'  {target} = ({expression}) / 1000;')
+    out.append('}')
+    return '\n'.join(out) + '\n'
+
+
+def random_program(seed: int, statements: int = 15):
+    """Return a random, well-typed-ish script for comparing engines.
+
+    Programs declare, shadow, assign and print number and string variables
+    inside nested blocks. A few expressions are deliberately ill-typed or
+    read undefined variables, so runtime errors get compared too.
+    """
+    rng = random.Random(seed)
+    numbers, strings = ['a', 'b', 'c'], ['s', 't']
+
+    def number(depth):
+        choice = rng.randrange(7 if depth < 4 else 2)
+        if choice == 0:
+            return rng.choice(['1', '2.5', '0.5', '3', '10', '0'])
+        if choice == 1:
+            return rng.choice(numbers)
+        if choice == 2:
+            return f'({number(depth + 1)})'
+        if choice == 3:
+            return f'-{number(depth + 1)}'
+        operator = rng.choice(['+', '-', '*', '+'])
+        return f'{number(depth + 1)} {operator} {number(depth + 1)}'
+
+    def string(depth):
+        choice = rng.randrange(4 if depth < 4 else 2)
+        if choice == 0:
+            return rng.choice(['"x"', '"yz"', '""'])
+        if choice == 1:
+            return rng.choice(strings)
+        if choice == 2:
+            return f'({string(depth + 1)})'
+        return f'{string(depth + 1)} + {string(depth + 1)}'
+
+    def assignment():
+        if rng.random() < .5:
+            return f'{rng.choice(numbers)} = {number(0)}'
+        return f'{rng.choice(strings)} = {string(0)}'
+
+    def expression(depth):
+        choice = rng.randrange(12)
+        if choice < 4:
+            return number(depth)
+        if choice < 6:
+            return string(depth)
+        if choice == 6:
+            operator = rng.choice(['<', '<=', '>', '>=', '==', '!='])
+            return f'{number(depth + 1)} {operator} {number(depth + 1)}'
+        if choice == 7:
+            operator = rng.choice(['==', '!='])
+            return f'{string(depth + 1)} {operator} {expression(depth + 1)}'
+        if choice == 8:
+            return f'!{expression(depth + 1)}'
+        if choice == 9:
+            return rng.choice(['true', 'false', 'nil'])
+        if choice == 10 and rng.random() < .15:
+            return rng.choice(['undefined', '"a" - 1', '-"s"', '1 + "s"',
+                               'nil < 1', 'true * 2'])
+        if choice == 11:
+            return f'{rng.choice(numbers)} + ({assignment()})'
+        return number(depth)
+
+    def declaration():
+        if rng.random() < .6:
+            return f'var {rng.choice(numbers)} = {number(0)};'
+        if rng.random() < .8:
+            return f'var {rng.choice(strings)} = {string(0)};'
+        return f'var {rng.choice(numbers + strings)};'
+
+    def block(count, depth):
+        out = []
+        for _ in range(count):
+            choice = rng.randrange(7)
+            if choice == 0 and depth < 5:
+                out.append('{')
+                out.extend(block(rng.randrange(6), depth + 1))
+                out.append('}')
+            elif choice in (1, 2):
+                out.append(declaration())
+            elif choice == 3:
+                out.append(f'{assignment()};')
+            elif choice == 4:
+                out.append(f'print {assignment()};')
+            elif choice == 5 and rng.random() < .25:
+                # Zeros print their sign, so engines must keep -0 and 0
+                # apart even where they are equal.
+                out.append(f'print {rng.choice(["0", "-0", "-(0)"])};')
+            else:
+                out.append(f'print {expression(0)};')
+        return out
+
+    out = ['var a = 1; var b = 2; var c = 3; var s = "s"; var t = "t";']
+    out.extend(block(rng.randrange(1, statements), 0))
+    return '\n'.join(out) + '\n'
+
+
+def literals(statements: int, terms: int = 20, seed: int = 0):
+    """Return a script of long arithmetic and concatenation on literals."""
+    rng = random.Random(seed)
+    out = ['var total = 0;']
+    for i in range(statements):
+        if rng.randrange(3):
+            numbers = [str(rng.randrange(1, 100)) for _ in range(terms)]
+            operators = [rng.choice(['+', '-', '*', '/']) for _ in numbers]
+            expression = numbers[0]
+            for operator, number in zip(operators, numbers[1:]):
+                expression = f'({expression} {operator} {number})'
+            out.append(f'total = total + {expression};')
+        else:
+            strings = [f'"part{rng.randrange(100)}"' for _ in range(terms)]
+            out.append(f'var s{i} = {" + ".join(strings)};')
+    out.append('print total;')
+    return '\n'.join(out) + '\n'
+
+
+def many_globals(count: int, reads: int = 4, seed: int = 0):
+    """Return a script declaring count globals, then reading and printing
+    sums of them."""
+    rng = random.Random(seed)
+    out = [f'var g{i} = {i};' for i in range(count)]
+    for i in range(count):
+        names = [f'g{rng.randrange(count)}' for _ in range(reads)]
+        out.append(f'print {" + ".join(names)};')
+    return '\n'.join(out) + '\n'
+
+
+def concatenation(statements: int, pieces: int = 8, seed: int = 0):
+    """Return a script that keeps growing a string with +, in a block so
+    the string is a local."""
+    rng = random.Random(seed)
+    out = ['{', '  var s = "";']
+    for i in range(statements):
+        parts = [f'"{rng.choice("abcdef") * rng.randrange(1, 6)}"'
+                 for _ in range(pieces)]
+        out.append(f'  s = s + {" + ".join(parts)};')
+        if i % 100 == 99:
+            out.append('  print s;')
+    out.append('}')
+    return '\n'.join(out) + '\n'
+
+
+def prints(lines: int):
+    """Return a script of lines print statements, of numbers and strings."""
+    return ''.join(f'print {i} * 2;\nprint "line " + "{i % 10}";\n'
+                   for i in range(lines // 2))
@@ -0,0 +1,111 @@
+import hashlib
+import os
+import pickle
+import struct
+import tempfile
+import zlib
+from typing import List, Optional
+
+from interpreter import gc_paused
+from stmt import Stmt
+
+
+MAGIC = b'LOXC'
+# Bump whenever the pickled form of the AST changes, e.g. a node gains a
+# field, so stale caches are ignored rather than loaded.
+FORMAT_VERSION = 6
+DIRECTORY = '__loxcache__'
+SUFFIX = '.loxc'
+
+# A cache file is this header followed by the pickled statements,
+# compressed with zlib:
+#
+#   magic       4 bytes     MAGIC
+#   version     2 bytes     FORMAT_VERSION, little endian
+#   optimize    1 byte      the -O level the statements were folded with
+#   digest      32 bytes    SHA-256 of the UTF-8 encoded source, or of the
+#                           mapped bytes of a script run with --mmap
+#
+# A file whose header doesn't match the script and options being run is
+# ignored, and replaced once the script has been parsed again.
+header = struct.Struct('<4sHB32s')
+
+
+def cache_path(path: str, cache_dir: str = None) -> str:
+    """Return the cache file used for the script at path.
+
+    Like __pycache__, the default for dir/script.lox is
+    dir/__loxcache__/script.loxc.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    name = os.path.splitext(name)[0]
+    if cache_dir is None:
+        return os.path.join(directory, DIRECTORY, name + SUFFIX)
+    # One cache dir serves scripts from many directories.
+    tag = hashlib.sha256(directory.encode('utf-8', 'surrogateescape'))
+    return os.path.join(cache_dir, f'{name}-{tag.hexdigest()[:16]}{SUFFIX}')
+
+
+def make_header(source: str, optimize: int) -> bytes:
+    if isinstance(source, str):
+        source = source.encode('utf-8', 'surrogatepass')
+    digest = hashlib.sha256(source).digest()
+    return header.pack(MAGIC, FORMAT_VERSION, optimize, digest)
+
+
+def load(path: str, source: str, optimize: int,
+         cache_dir: str = None) -> Optional[List[Stmt]]:
+    """Return the cached statements for source, or None on a miss."""
+    expected = make_header(source, optimize)
+    try:
+        with open(cache_path(path, cache_dir), 'rb') as file:
+            if file.read(header.size) != expected:
+                return None
+            data = file.read()
+    except OSError:
+        return None
+
+    try:
+        with gc_paused():
+            return pickle.loads(zlib.decompress(data))
+    except Exception:
+        # Corrupt or written by an incompatible pylox.
+        return None
+
+
+def store(path: str, source: str, optimize: int, statements: List[Stmt],
+          cache_dir: str = None):
+    """Write statements to the cache for source, if possible.
+
+    The file is written under a temporary name and renamed into place, so
+    concurrent runs see either a whole old file or a whole new one. Failing
+    to write it just means the script is parsed again next time.
+    """
+    try:
+        with gc_paused():
+            data = pickle.dumps(statements, pickle.HIGHEST_PROTOCOL)
+    except RecursionError:
+        # Too deeply nested to pickle, it will be parsed every time.
+        return
+    # Pickles of the AST are large and very repetitive.
+    data = zlib.compress(data, 1)
+
+    target = cache_path(path, cache_dir)
+    directory = os.path.dirname(target)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(make_header(source, optimize))
+            file.write(data)
+        # mkstemp() makes the file private, give it the script's permissions.
+        os.chmod(temporary, os.stat(path).st_mode & 0o666)
+        os.replace(temporary, target)
+    except OSError:
+        try:
+            os.unlink(temporary)
+        except OSError:
+            pass
@@ -0,0 +1,226 @@
+import operator
+from typing import List
+
+from expr import *
+from interpreter import (
+    GlobalEnvironment, RuntimeError, SlotEnvironment, gc_paused, stringify,
+    truthy,
+)
+from output import Output, StdoutOutput
+from resolver import Resolver
+from stmt import *
+from tokens import TokenType as tt
+
+
+class ClosureCompiler:
+    """
+    Compile a resolved AST into nested Python closures.
+
+    Each node becomes one closure taking the current environment. Operators
+    are decoded once, at compile time, and the closures call each other
+    directly, so executing a node costs one Python call instead of
+    evaluate() -> accept() -> visitXxx() plus an operator if-chain.
+    """
+    def __init__(self, globals: GlobalEnvironment, output: Output = None,
+                 new_environment=SlotEnvironment):
+        self.globals = globals
+        self.output = output if output is not None else StdoutOutput()
+        self.new_environment = new_environment
+
+    def compile(self, node):
+        return node.accept(self)
+
+    def visitLiteralExpr(self, expr: Literal):
+        value = expr.value
+        return lambda environment: value
+
+    def visitGroupingExpr(self, expr: Grouping):
+        return expr.expression.accept(self)
+
+    def visitVariableExpr(self, expr: Variable):
+        depth, slot = expr.depth, expr.slot
+        if slot is None:
+            globals = self.globals
+
+            def get_global(environment):
+                cell = expr.cell
+                if cell is not None:
+                    return cell.value
+                return globals.lookup(expr).value
+            return get_global
+        if depth == 0:
+            return lambda environment: environment.values[slot]
+        if depth == 1:
+            return lambda environment: environment.enclosing.values[slot]
+
+        def variable(environment):
+            for _ in range(depth):
+                environment = environment.enclosing
+            return environment.values[slot]
+        return variable
+
+    def visitAssignExpr(self, expr: Assign):
+        depth, slot = expr.depth, expr.slot
+        value = expr.value.accept(self)
+        if slot is None:
+            globals = self.globals
+
+            def assign_global(environment):
+                result = value(environment)
+                cell = expr.cell
+                if cell is None:
+                    cell = globals.lookup(expr)
+                cell.value = result
+                return result
+            return assign_global
+
+        def assign_local(environment):
+            result = value(environment)
+            for _ in range(depth):
+                environment = environment.enclosing
+            environment.values[slot] = result
+            return result
+        return assign_local
+
+    def visitUnaryExpr(self, expr: Unary):
+        operator = expr.operator
+        right = expr.right.accept(self)
+
+        if operator.type == tt.MINUS:
+            def negate(environment):
+                value = right(environment)
+                if isinstance(value, float):
+                    return -value
+                raise RuntimeError(operator, 'Operand must be a number.')
+            return negate
+
+        if operator.type == tt.BANG:
+            return lambda environment: not truthy(right(environment))
+
+        # Unreachable
+        raise Exception('you dun goofed.')
+
+    def visitBinaryExpr(self, expr: Binary):
+        operator = expr.operator
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        type = operator.type
+
+        if type == tt.BANG_EQUAL:
+            return lambda environment: left(environment) != right(environment)
+        if type == tt.EQUAL_EQUAL:
+            return lambda environment: left(environment) == right(environment)
+        if type == tt.PLUS:
+            def add(environment):
+                a = left(environment)
+                b = right(environment)
+                if isinstance(a, float) and isinstance(b, float):
+                    return a + b
+                elif isinstance(a, str) and isinstance(b, str):
+                    return a + b
+                raise RuntimeError(operator,
+                                   'Operands must be two numbers or two strings.')
+            return add
+
+        apply = self.comparisons_and_arithmetic[type]
+
+        def numeric(environment):
+            a = left(environment)
+            b = right(environment)
+            if isinstance(a, float) and isinstance(b, float):
+                return apply(a, b)
+            raise RuntimeError(operator, 'Operands must be a numbers.')
+        return numeric
+
+    comparisons_and_arithmetic = {
+        tt.GREATER:         operator.gt,
+        tt.GREATER_EQUAL:   operator.ge,
+        tt.LESS:            operator.lt,
+        tt.LESS_EQUAL:      operator.le,
+        tt.MINUS:           operator.sub,
+        tt.SLASH:           operator.truediv,
+        tt.STAR:            operator.mul,
+    }
+
+    def visitExpressionStmt(self, stmt: Expression):
+        return stmt.expression.accept(self)
+
+    def visitPrintStmt(self, stmt: Print):
+        expression = stmt.expression.accept(self)
+        write = self.output.print
+        return lambda environment: write(stringify(expression(environment)))
+
+    def visitVarStmt(self, stmt: Var):
+        if stmt.initializer is not None:
+            initializer = stmt.initializer.accept(self)
+        else:
+            initializer = lambda environment: None
+
+        slot = stmt.slot
+        if slot is None:
+            define, name = self.globals.define, stmt.name.lexeme
+            return lambda environment: define(name, initializer(environment))
+
+        def var(environment):
+            environment.values[slot] = initializer(environment)
+        return var
+
+    def visitBlockStmt(self, stmt: Block):
+        statements = [statement.accept(self) for statement in stmt.statements]
+        size = stmt.size
+        new_environment = self.new_environment
+
+        def block(environment):
+            environment = new_environment(environment, size)
+            for statement in statements:
+                statement(environment)
+        return block
+
+
+class ClosureInterpreter:
+    """An Interpreter that runs statements compiled by ClosureCompiler."""
+    new_environment = SlotEnvironment
+
+    def __init__(self, output: Output = None):
+        self.globals = GlobalEnvironment()
+        self.errors = []
+        self.output = output if output is not None else StdoutOutput()
+
+    def interpret(self, statements: List[Stmt]):
+        # Each statement is compiled just before it runs, rather than by
+        # compile(), so run_stream() can pass statements as they're parsed.
+        resolver = Resolver()
+        compiler = ClosureCompiler(self.globals, self.output,
+                                   self.new_environment)
+        try:
+            for statement in statements:
+                resolver.resolve([statement])
+                with gc_paused():
+                    compiled = compiler.compile(statement)
+                compiled(self.globals)
+        except RuntimeError as error:
+            self.errors.append(error)
+        finally:
+            self.output.flush()
+
+    def compile(self, statements: List[Stmt]) -> list:
+        """Resolve statements and compile each into a closure."""
+        resolver = Resolver()
+        compiler = ClosureCompiler(self.globals, self.output,
+                                   self.new_environment)
+        compiled = []
+        with gc_paused():
+            for statement in statements:
+                resolver.resolve([statement])
+                compiled.append(compiler.compile(statement))
+        return compiled
+
+    def interpret_compiled(self, compiled: list):
+        """Run the closures compile() returned, which may be run again."""
+        try:
+            for statement in compiled:
+                statement(self.globals)
+        except RuntimeError as error:
+            self.errors.append(error)
+        finally:
+            self.output.flush()
@@ -0,0 +1,479 @@
+import ast
+import sys
+import traceback
+from typing import Iterator, List
+
+from expr import *
+from interpreter import GlobalEnvironment, RuntimeError, gc_paused, stringify
+from output import Output, StdoutOutput
+from resolver import Resolver
+from stmt import *
+from tokens import Token, TokenType, TokenType as tt
+
+
+# Programs are translated into functions of about this many generated
+# statements each, rather than one function that grows with the program.
+# CPython compiles small functions faster, per statement, than big ones.
+function_size = 100
+
+
+class PythonGenerator:
+    """
+    Translate resolved statements into a Python ast.Module.
+
+    The program is flattened into simple statements: every intermediate
+    value goes through a temporary (_0, _1, ...), so evaluation order and
+    runtime type checks are explicit and CPython runs the program with its
+    own bytecode. The statements are split between functions __lox_0__(),
+    __lox_1__(), ... (see translate()), which the module's __lox__() calls
+    in turn.
+
+    Lox locals become Python locals, renamed per declaration (a block's `x`
+    becomes x_3) so shadowing works without nested Python scopes. When a
+    function ends inside a block, it returns the locals in scope there and
+    the next function takes them as its parameters. Globals stay in the
+    GlobalEnvironment's Cells. Each generated node is given the Lox line it
+    came from as it is built.
+    """
+    def __init__(self):
+        self.body = []
+        self.scopes = []
+        self.declared = 0
+        self.register = 0
+        self.assigned = {}
+        self.types = {}
+        self.line = 1
+        # The functions finished so far, the statements calling them that
+        # make up __lox__(), and the parameters of the function being
+        # generated.
+        self.finished = []
+        self.calls = []
+        self.parameters = []
+
+    def generate(self, statements: List[Stmt]) -> ast.Module:
+        self.translate(statements)
+        calls = self.calls or [ast.Pass(lineno=1, col_offset=0)]
+        return module(self.finished + [function('__lox__', [], calls)])
+
+    def translate(self, statements: List[Stmt]):
+        """
+        Translate statements, ending the function being generated after
+        any statement that brings it to function_size generated statements,
+        and after the last one.
+        """
+        for statement in statements:
+            statement.accept(self)
+            self.split()
+        if self.body:
+            self.end_function()
+
+    def split(self):
+        if len(self.body) >= function_size:
+            self.end_function()
+
+    def end_function(self):
+        # The locals in scope go on to the next function.
+        live = [name for scope in self.scopes for name in scope
+                if name is not None]
+        body = self.body
+        if live:
+            line = body[-1].lineno
+            body.append(ast.Return(tuple_of(live, LOAD, line), lineno=line,
+                                   col_offset=0))
+        name = f'__lox_{len(self.calls)}__'
+        run = call(name, 1, *(load(parameter, 1)
+                              for parameter in self.parameters))
+        if live:
+            self.calls.append(ast.Assign(targets=[tuple_of(live, STORE, 1)],
+                                         value=run, lineno=1, col_offset=0))
+        else:
+            self.calls.append(ast.Expr(run, lineno=1, col_offset=0))
+        defined = function(name, self.parameters, body)
+        self.body = []
+        self.assigned = {}
+        self.parameters = live
+        self.finish(defined)
+
+    def finish(self, function: ast.FunctionDef):
+        """Keep a function that has been generated, see generate()."""
+        self.finished.append(function)
+
+    def node(self, kind: type, *args, **fields) -> ast.AST:
+        """Return a new kind of ast node, at the line being translated."""
+        return kind(*args, lineno=self.line, col_offset=0, **fields)
+
+    def emit(self, statement: ast.stmt):
+        self.body.append(statement)
+
+    def temporary(self):
+        return f'_{self.register}'
+
+    def store(self, name: str, value: ast.expr, type: type = None):
+        self.emit(self.node(ast.Assign, targets=[store(name, self.line)],
+                            value=value))
+        self.types[name] = type or static_type(value)
+        return self.load(name)
+
+    def load(self, name: str):
+        # There is no control flow, so the type a local was last stored or
+        # checked with is the type it has here.
+        result = load(name, self.line)
+        result.lox_type = self.types.get(name)
+        return result
+
+    def fail(self, operator: Token, message: str) -> ast.stmt:
+        line = self.line
+        return self.node(ast.Expr, call('_fail', line,
+                                        constant(operator.type.name, line),
+                                        constant(operator.lexeme, line),
+                                        constant(operator.line, line),
+                                        constant(message, line)))
+
+    def check(self, operator: Token, message: str, *requirements):
+        """
+        Emit a call to _fail() unless one of requirements holds. Each is a
+        list of (operand, type) pairs that must all match; operands whose
+        type is known statically are checked here rather than at runtime.
+        """
+        line = self.line
+        tests = []
+        for requirement in requirements:
+            conjuncts = []
+            for operand, type in requirement:
+                known = static_type(operand)
+                if known is not None:
+                    if known is not type:
+                        break
+                else:
+                    conjuncts.append(self.node(
+                        ast.Compare, left=call('type', line, operand),
+                        ops=[ast.Is()],
+                        comparators=[load(type.__name__, line)]))
+            else:
+                if not conjuncts:
+                    # Statically known to hold.
+                    return
+                tests.append(self.all_of(conjuncts))
+
+        if not tests:
+            # Statically known to fail.
+            self.emit(self.fail(operator, message))
+            return
+        test = tests[0] if len(tests) == 1 else self.node(ast.BoolOp,
+                                                          ast.Or(), tests)
+        self.emit(self.node(ast.If,
+                            test=self.node(ast.UnaryOp, ast.Not(), test),
+                            body=[self.fail(operator, message)],
+                            orelse=[]))
+        if len(requirements) == 1:
+            # Past the check, its operands are known to have those types.
+            for operand, type in requirements[0]:
+                if isinstance(operand, ast.Name):
+                    operand.lox_type = self.types[operand.id] = type
+
+    def all_of(self, tests: list):
+        if len(tests) == 1:
+            return tests[0]
+        return self.node(ast.BoolOp, ast.And(), tests)
+
+    def local(self, depth: int, slot: int) -> str:
+        return self.scopes[-1 - depth][slot]
+
+    def visitBlockStmt(self, stmt: Block):
+        self.scopes.append([None] * stmt.size)
+        for statement in stmt.statements:
+            statement.accept(self)
+            self.split()
+        self.scopes.pop()
+
+    def visitExpressionStmt(self, stmt: Expression):
+        stmt.expression.accept(self)
+
+    def visitPrintStmt(self, stmt: Print):
+        value = stmt.expression.accept(self)
+        line = self.line
+        self.emit(self.node(ast.Expr, call('_print', line,
+                                           call('_stringify', line, value))))
+
+    def visitVarStmt(self, stmt: Var):
+        if stmt.initializer is not None:
+            value = stmt.initializer.accept(self)
+        else:
+            value = self.node(ast.Constant, None)
+
+        line = self.line = stmt.name.line
+        if stmt.slot is None:
+            self.emit(self.node(ast.Expr, call(
+                '_define', line, constant(stmt.name.lexeme, line), value)))
+            return
+
+        scope = self.scopes[-1]
+        if scope[stmt.slot] is None:
+            self.declared += 1
+            scope[stmt.slot] = f'{stmt.name.lexeme}_{self.declared}'
+        self.store(scope[stmt.slot], value)
+
+    def visitAssignExpr(self, expr: Assign):
+        value = expr.value.accept(self)
+        line = self.line = expr.name.line
+        if expr.slot is not None:
+            name = self.local(expr.depth, expr.slot)
+            self.assigned[name] = len(self.body)
+            return self.store(name, value)
+
+        if not isinstance(value, ast.Name) or value.id != self.temporary():
+            value = self.store(self.temporary(), value)
+        self.emit(self.node(ast.Expr, call(
+            '_set_global', line, constant(expr.name.lexeme, line), value,
+            constant(line, line))))
+        return value
+
+    def visitBinaryExpr(self, expr: Binary):
+        register = self.register
+        left = expr.left.accept(self)
+        self.register += 1
+        mark = len(self.body)
+        right = expr.right.accept(self)
+        self.register = register
+        if isinstance(left, ast.Name) and self.assigned.get(left.id, -1) >= mark:
+            # The right operand assigned to the local read on the left, so
+            # read it into a temporary before that happens.
+            line = self.body[mark].lineno
+            copy = ast.Assign(targets=[store(self.temporary(), line)],
+                              value=left, lineno=line, col_offset=0)
+            self.body.insert(mark, copy)
+            type = left.lox_type
+            left = load(self.temporary(), line)
+            left.lox_type = self.types[left.id] = type
+
+        operator = expr.operator
+        self.line = operator.line
+        type = operator.type
+        if type == tt.BANG_EQUAL:
+            value = self.node(ast.Compare, left, [ast.NotEq()], [right])
+            result = bool
+        elif type == tt.EQUAL_EQUAL:
+            value = self.node(ast.Compare, left, [ast.Eq()], [right])
+            result = bool
+        elif type == tt.PLUS:
+            self.check(operator, 'Operands must be two numbers or two strings.',
+                       [(left, float), (right, float)],
+                       [(left, str), (right, str)])
+            value = self.node(ast.BinOp, left, ast.Add(), right)
+            result = static_type(left) or static_type(right)
+        else:
+            self.check(operator, 'Operands must be a numbers.',
+                       [(left, float), (right, float)])
+            op = self.operators[type]
+            if isinstance(op, ast.cmpop):
+                value = self.node(ast.Compare, left, [op], [right])
+                result = bool
+            else:
+                value, result = self.node(ast.BinOp, left, op, right), float
+        return self.store(self.temporary(), value, result)
+
+    operators = {
+        tt.GREATER:         ast.Gt(),
+        tt.GREATER_EQUAL:   ast.GtE(),
+        tt.LESS:            ast.Lt(),
+        tt.LESS_EQUAL:      ast.LtE(),
+        tt.MINUS:           ast.Sub(),
+        tt.SLASH:           ast.Div(),
+        tt.STAR:            ast.Mult(),
+    }
+
+    def visitGroupingExpr(self, expr: Grouping):
+        return expr.expression.accept(self)
+
+    def visitLiteralExpr(self, expr: Literal):
+        return self.node(ast.Constant, expr.value)
+
+    def visitUnaryExpr(self, expr: Unary):
+        right = expr.right.accept(self)
+        operator = expr.operator
+        self.line = operator.line
+        if operator.type == tt.MINUS:
+            self.check(operator, 'Operand must be a number.',
+                       [(right, float)])
+            return self.store(self.temporary(),
+                              self.node(ast.UnaryOp, ast.USub(), right),
+                              float)
+
+        # !right is true for nil and false only.
+        if isinstance(right, ast.Constant):
+            return self.node(ast.Constant,
+                             right.value is None or right.value is False)
+        value = self.node(ast.BoolOp, ast.Or(), [
+            self.node(ast.Compare, right, [ast.Is()],
+                      [self.node(ast.Constant, None)]),
+            self.node(ast.Compare, right, [ast.Is()],
+                      [self.node(ast.Constant, False)]),
+        ])
+        return self.store(self.temporary(), value, bool)
+
+    def visitVariableExpr(self, expr: Variable):
+        line = self.line = expr.name.line
+        if expr.slot is not None:
+            return self.load(self.local(expr.depth, expr.slot))
+
+        # An undefined global raises KeyError, the interpreter reports it
+        # with the line the traceback points to.
+        cell = subscript(load('_globals', line),
+                         constant(expr.name.lexeme, line), line)
+        return self.store(self.temporary(),
+                          self.node(ast.Attribute, value=cell, attr='value',
+                                    ctx=LOAD))
+
+
+LOAD, STORE = ast.Load(), ast.Store()
+
+
+def load(name: str, line: int):
+    return ast.Name(name, LOAD, lineno=line, col_offset=0)
+
+
+def store(name: str, line: int):
+    return ast.Name(name, STORE, lineno=line, col_offset=0)
+
+
+def constant(value, line: int):
+    return ast.Constant(value, lineno=line, col_offset=0)
+
+
+def subscript(value: ast.expr, key: ast.expr, line: int):
+    """Return value[key], loaded."""
+    if sys.version_info < (3, 9):
+        # Before 3.9 an index is wrapped in an ast.Index.
+        key = ast.Index(key)
+    return ast.Subscript(value=value, slice=key, ctx=LOAD, lineno=line,
+                         col_offset=0)
+
+
+def call(function: str, line: int, *args):
+    return ast.Call(load(function, line), list(args), [], lineno=line,
+                    col_offset=0)
+
+
+def tuple_of(names: List[str], ctx: ast.expr_context, line: int):
+    return ast.Tuple([ast.Name(name, ctx, lineno=line, col_offset=0)
+                      for name in names], ctx, lineno=line, col_offset=0)
+
+
+def function(name: str, parameters: List[str],
+             body: List[ast.stmt]) -> ast.FunctionDef:
+    """Return a function taking parameters, defined on line 1."""
+    last = max(statement.lineno for statement in body)
+    args = [ast.arg(arg=parameter, annotation=None, lineno=1, col_offset=0)
+            for parameter in parameters]
+    return ast.FunctionDef(
+        name=name,
+        args=ast.arguments(posonlyargs=[], args=args, vararg=None,
+                           kwonlyargs=[], kw_defaults=[], kwarg=None,
+                           defaults=[]),
+        body=body,
+        decorator_list=[],
+        returns=None,
+        lineno=1, col_offset=0, end_lineno=last, end_col_offset=0,
+    )
+
+
+def module(body: List[ast.stmt]) -> ast.Module:
+    return ast.Module(body=body, type_ignores=[])
+
+
+def static_type(operand: ast.expr):
+    """Return the Python type operand always has at runtime, if known."""
+    if isinstance(operand, ast.Constant):
+        return operand.value.__class__
+    return getattr(operand, 'lox_type', None)
+
+
+def translate(statements: List[Stmt]) -> ast.Module:
+    """Resolve statements and translate them into a Python module."""
+    Resolver().resolve(statements)
+    with gc_paused():
+        return PythonGenerator().generate(statements)
+
+
+def dump(module: ast.Module) -> str:
+    """
+    Return the Python source of a generated module. This needs Python 3.9
+    or later, for ast.unparse(); pylox.py checks that before calling it.
+    """
+    return ast.unparse(module)
+
+
+class CompilingGenerator(PythonGenerator):
+    """
+    A PythonGenerator that compiles each function as soon as it is
+    finished, so only one function's ast is kept at a time. finished holds
+    (name, code object defining it) pairs rather than the functions.
+    """
+    def finish(self, function: ast.FunctionDef):
+        code = compile(module([function]), '<lox>', 'exec')
+        self.finished.append((function.name, code))
+
+
+class PythonInterpreter:
+    """An Interpreter that runs programs translated by PythonGenerator.
+
+    The whole program is translated and compiled before any of it runs.
+    """
+    def __init__(self, output: Output = None):
+        self.globals = GlobalEnvironment()
+        self.errors = []
+        self.output = output if output is not None else StdoutOutput()
+
+    def namespace(self):
+        globals = self.globals
+
+        def fail(type: str, lexeme: str, line: int, message: str):
+            raise RuntimeError(Token(TokenType[type], lexeme, None, line),
+                               message)
+
+        def set_global(name: str, value, line: int):
+            globals.assign(Token(tt.IDENTIFIER, name, None, line), value)
+
+        return {
+            '_globals':             globals.values,
+            '_define':              globals.define,
+            '_set_global':          set_global,
+            '_fail':                fail,
+            '_print':               self.output.print,
+            '_stringify':           stringify,
+        }
+
+    def compile(self, statements: List[Stmt]) -> list:
+        """
+        Translate and compile statements, returning (name, code object
+        defining it) pairs for the functions to run in turn.
+        """
+        statements = list(statements)
+        Resolver().resolve(statements)
+        generator = CompilingGenerator()
+        with gc_paused():
+            generator.translate(statements)
+        return generator.finished
+
+    def interpret(self, statements: List[Stmt]):
+        self.interpret_compiled(self.compile(statements))
+
+    def interpret_compiled(self, functions: list):
+        """Run the functions compile() returned, which may be run again."""
+        namespace = self.namespace()
+        try:
+            # The locals each function returns, for the next one.
+            live = ()
+            for name, code in functions:
+                exec(code, namespace)
+                live = namespace[name](*live) or ()
+        except RuntimeError as error:
+            self.errors.append(error)
+        except KeyError as error:
+            name = error.args[0]
+            line = traceback.extract_tb(error.__traceback__)[-1].lineno
+            self.errors.append(
+                RuntimeError(Token(tt.IDENTIFIER, name, None, line),
+                             f"Undefined variable '{name}'."))
+        finally:
+            self.output.flush()
@@ -23,57 +23,111 @@ class ExprVisitor:
 
 
 class Expr:
+    __slots__ = ()
+
     def accept(visitor: ExprVisitor):
         raise NotImplementedError
 
 
 class Assign(Expr):
+    __slots__ = ('name', 'value', 'depth', 'slot', 'cell')
+    _fields = ('name', 'value')
+    _annotations = ('depth', 'slot', 'cell')
+
     def __init__(self, name: Token, value: Expr):
         self.name = name
         self.value = value
+        self.depth = None
+        self.slot = None
+        self.cell = None
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visitAssignExpr(self)
 
+    def __repr__(self):
+        return f'Assign({self.name!r}, {self.value!r})'
+
 
 class Binary(Expr):
+    __slots__ = ('left', 'operator', 'right', 'handler', 'feedback')
+    _fields = ('left', 'operator', 'right')
+    _annotations = ('handler', 'feedback')
+
     def __init__(self, left: Expr, operator: Token, right: Expr):
         self.left = left
         self.operator = operator
         self.right = right
+        self.handler = None
+        self.feedback = None
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visitBinaryExpr(self)
 
+    def __repr__(self):
+        return f'Binary({self.left!r}, {self.operator!r}, {self.right!r})'
+
 
 class Grouping(Expr):
+    __slots__ = ('expression',)
+    _fields = ('expression',)
+    _annotations = ()
+
     def __init__(self, expression: Expr):
         self.expression = expression
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visitGroupingExpr(self)
 
+    def __repr__(self):
+        return f'Grouping({self.expression!r})'
+
 
 class Literal(Expr):
+    __slots__ = ('value',)
+    _fields = ('value',)
+    _annotations = ()
+
     def __init__(self, value):
         self.value = value
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visitLiteralExpr(self)
 
+    def __repr__(self):
+        return f'Literal({self.value!r})'
+
 
 class Unary(Expr):
+    __slots__ = ('operator', 'right', 'handler', 'feedback')
+    _fields = ('operator', 'right')
+    _annotations = ('handler', 'feedback')
+
     def __init__(self, operator: Token, right: Expr):
         self.operator = operator
         self.right = right
+        self.handler = None
+        self.feedback = None
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visitUnaryExpr(self)
 
+    def __repr__(self):
+        return f'Unary({self.operator!r}, {self.right!r})'
+
 
 class Variable(Expr):
+    __slots__ = ('name', 'depth', 'slot', 'cell')
+    _fields = ('name',)
+    _annotations = ('depth', 'slot', 'cell')
+
     def __init__(self, name: Token):
         self.name = name
+        self.depth = None
+        self.slot = None
+        self.cell = None
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visitVariableExpr(self)
+
+    def __repr__(self):
+        return f'Variable({self.name!r})'
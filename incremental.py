@@ -0,0 +1,233 @@
+from array import array
+from bisect import bisect_left
+from typing import List
+
+from expr import Expr
+from parser import ArrayParser, ParseError
+from pylox import ArrayScanner
+from stmt import Stmt
+from tokens import Token, TokenArray
+
+
+class OffsetScanner(ArrayScanner):
+    """An ArrayScanner that also records the offset of each error."""
+    def __init__(self, source: str):
+        super().__init__(source)
+        self.offsets = []
+
+    def error(self, message):
+        super().error(message)
+        self.offsets.append(self.start)
+
+
+class Declaration:
+    """
+    A top-level declaration: its statement (None after a syntax error),
+    the errors parsing it and the tokens [start, end) it was parsed from.
+    """
+    __slots__ = ('start', 'end', 'statement', 'errors')
+
+    def __init__(self, start: int, end: int, statement: Stmt,
+                 errors: List[ParseError]):
+        self.start = start
+        self.end = end
+        self.statement = statement
+        self.errors = errors
+
+
+class Document:
+    """
+    A script being edited, kept scanned and parsed.
+
+    After edit(), tokens, statements and errors are what an ArrayScanner and
+    an ArrayParser would give for the new source, but only the source from
+    just before the edit up to where the scanner falls back in step with
+    the old tokens is rescanned, and only the declarations whose tokens
+    changed are parsed again. The other declarations are reused, with the
+    lines of their tokens shifted if the edit added or removed lines.
+    rescanned and reparsed count the tokens and declarations the last edit
+    produced anew.
+    """
+    def __init__(self, source: str):
+        self.source = source
+        self.tokens, self.scan_errors, _ = self.scan(source, 0, 1)
+        self.declarations = self.parse(0)
+        self.rescanned = len(self.tokens)
+        self.reparsed = len(self.declarations)
+
+    @property
+    def statements(self) -> List[Stmt]:
+        return [declaration.statement for declaration in self.declarations]
+
+    @property
+    def errors(self) -> list:
+        errors = [error for _, error in self.scan_errors]
+        for declaration in self.declarations:
+            errors.extend(declaration.errors)
+        return errors
+
+    def edit(self, offset: int, removed: int, inserted: str):
+        """Replace the removed characters at offset with inserted."""
+        old_source, tokens = self.source, self.tokens
+        if not 0 <= offset <= offset + removed <= len(old_source):
+            raise ValueError('edit outside the source')
+        source = old_source[:offset] + inserted + old_source[offset+removed:]
+        delta = len(inserted) - removed
+        lines = (inserted.count('\n')
+                 - old_source.count('\n', offset, offset + removed))
+        edited = offset + len(inserted)
+
+        # The first token the edit can change is the first one ending at or
+        # after it, and the one before: '1.' followed by an inserted '5' is
+        # a single number. Scanning restarts where the token before that
+        # ended, so comments and whitespace in between are scanned again.
+        first = max(bisect_left(tokens.ends, offset) - 1, 0)
+        if first > 0:
+            start, line = tokens.ends[first - 1], tokens.lines[first - 1]
+        else:
+            start, line = 0, 1
+
+        # Once a token starts past the edit where an old token started, the
+        # rest of the source scans as before.
+        old_starts = tokens.starts
+
+        def resync(position):
+            if position < edited:
+                return False
+            index = bisect_left(old_starts, position - delta, first)
+            return (index < len(old_starts)
+                    and old_starts[index] == position - delta)
+
+        scanned, scan_errors, stopped = self.scan(source, start, line, resync)
+        if stopped is None:
+            resumed = len(tokens)
+        else:
+            resumed = bisect_left(old_starts, stopped - delta, first)
+        self.tokens = self.splice(tokens, source, first, resumed, scanned,
+                                  delta, lines)
+        self.scan_errors = self.splice_errors(start, stopped, scan_errors,
+                                              delta, lines)
+        self.source = source
+        self.rescanned = len(scanned)
+
+        self.declarations = self.reparse(first, resumed, len(scanned), lines)
+
+    def scan(self, source: str, start: int, line: int, resync=None):
+        """
+        Scan source from offset start, at line, with an ArrayScanner.
+
+        Scanning stops before the first token for which resync(offset) is
+        true. Returns the tokens, the (offset, error) pairs for the errors
+        and the offset scanning stopped at, None if it got to the end.
+        """
+        scanner = OffsetScanner(source)
+        tokens = scanner.scan_tokens(start, line, resync)
+        errors = list(zip(scanner.offsets, scanner.errors))
+        if scanner.current < len(source):
+            return tokens, errors, scanner.current
+        return tokens, errors, None
+
+    def splice(self, tokens: TokenArray, source: str, first: int,
+               resumed: int, scanned: TokenArray, delta: int, lines: int):
+        """
+        Return tokens with [first, resumed) replaced by scanned, and the
+        offsets and lines of the ones after shifted.
+        """
+        spliced = TokenArray(source)
+        spliced.kinds = tokens.kinds[:first] + scanned.kinds
+        spliced.kinds += tokens.kinds[resumed:]
+        for name, shift in [('starts', delta), ('ends', delta),
+                            ('lines', lines)]:
+            old, new = getattr(tokens, name), getattr(scanned, name)
+            values = old[:first] + new
+            if shift:
+                values += array('I', [value + shift
+                                      for value in old[resumed:]])
+            else:
+                values += old[resumed:]
+            setattr(spliced, name, values)
+        return spliced
+
+    def splice_errors(self, start: int, stopped: int, errors: list,
+                      delta: int, lines: int):
+        """Merge the errors found rescanning from start with the others."""
+        before = [(offset, error) for offset, error in self.scan_errors
+                  if offset < start]
+        if stopped is None:
+            return before + errors
+        after = []
+        for offset, error in self.scan_errors:
+            if offset >= stopped - delta:
+                error.line += lines
+                after.append((offset + delta, error))
+        return before + errors + after
+
+    def parse(self, start: int, stop=None) -> List[Declaration]:
+        """
+        Parse declarations from the token at start, until the end or a
+        declaration ends at a token for which stop(index) is true.
+        """
+        parser = ArrayParser(self.tokens)
+        parser.current = start
+        declarations = []
+        while not parser.is_at_end():
+            parser.errors = []
+            statement = parser.declaration()
+            declarations.append(Declaration(start, parser.current, statement,
+                                            parser.errors))
+            start = parser.current
+            if stop is not None and stop(start):
+                break
+        return declarations
+
+    def reparse(self, first: int, resumed: int, scanned: int, lines: int):
+        """
+        Return the declarations after old tokens [first, resumed) were
+        replaced by scanned new ones.
+        """
+        old = self.declarations
+        shift = scanned - (resumed - first)
+        # A declaration depends on its tokens and the one after, which
+        # error recovery peeks at.
+        reparsed = 0
+        while reparsed < len(old) and old[reparsed].end < first:
+            reparsed += 1
+        kept = old[:reparsed]
+        start = kept[-1].end if kept else 0
+
+        # Stop at a declaration boundary past the new tokens that was also
+        # one before the edit, and reuse the old declarations from there.
+        changed = first + scanned
+        boundaries = {declaration.start: index
+                      for index, declaration in enumerate(old)
+                      if declaration.start >= resumed}
+
+        def stop(index):
+            return index >= changed and index - shift in boundaries
+
+        parsed = self.parse(start, stop)
+        self.reparsed = len(parsed)
+        if not parsed or parsed[-1].end - shift not in boundaries:
+            return kept + parsed
+
+        reused = old[boundaries[parsed[-1].end - shift]:]
+        for declaration in reused:
+            declaration.start += shift
+            declaration.end += shift
+            if lines:
+                shift_lines(declaration, lines)
+        return kept + parsed + reused
+
+
+def shift_lines(declaration: Declaration, lines: int):
+    """Add lines to the line of every token in declaration."""
+    nodes = [declaration.statement]
+    nodes.extend(error.token for error in declaration.errors)
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, Token):
+            node.line += lines
+        elif isinstance(node, list):
+            nodes.extend(node)
+        elif isinstance(node, (Expr, Stmt)):
+            nodes.extend(getattr(node, name) for name in node._fields)
@@ -1,17 +1,13 @@
+import contextlib
+import gc
 from typing import List
 
 from expr import *
+from operators import RuntimeError, binary_handlers, unary_handlers
+from output import Output, StdoutOutput
+from resolver import Resolver
 from stmt import *
-from tokens import Token, TokenType as tt
-
-
-class RuntimeError(Exception):
-    def __init__(self, token: Token, message: str):
-        self.token = token
-        self.message = message
-
-    def report(self):
-        return f'{self.message}\n[line {self.token.line}]'
+from tokens import Token
 
 
 def truthy(value):
@@ -23,28 +19,32 @@ def truthy(value):
     return True
 
 
-def floaty(value):
-    """Return value if it is a float, otherwise raise a Python TypeError.
-
-    Lox has one number type (float). There's no way to convert between types.
-
-    This function should only be called only after checkNumberOperand().
-    It is only backstop, hence why it can raises a Python specific exception.
-    """
-    if type(value) == float: return value
-    raise TypeError
-
-
-def stringy(value):
-    """Return value if it is a str, otherwise raise a Python TypeError.
-
-    Lox has one string type (str). There's no way to convert between types.
+@contextlib.contextmanager
+def gc_paused():
+    """Suspend the cyclic garbage collector within a with block.
 
-    This function should only be called only after checkNumberOperand().
-    It is only backstop, hence why it can raises a Python specific exception.
+    Compiling a large program creates many long lived objects and no cycles,
+    which makes the collector repeatedly traverse the whole heap for nothing.
     """
-    if type(value) == str: return value
-    raise TypeError
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def stringify(value):
+    """Return the text Lox prints for value."""
+    if value is None:
+        return 'nil'
+    text = str(value)
+    if isinstance(value, float) and text.endswith('.0'):
+        return text[:-2]
+    if isinstance(value, bool):
+        return text.lower()
+    return text
 
 
 class Environment:
@@ -57,7 +57,7 @@ class Environment:
 
     def assign(self, name: Token, value):
         if name.lexeme in self.values:
-            self.values[name] = value
+            self.values[name.lexeme] = value
         elif self.enclosing is not None:
             self.enclosing.assign(name, value)
         else:
@@ -72,75 +72,129 @@ class Environment:
             raise RuntimeError(name, f"Undefined variable '{name.lexeme}'.")
 
 
+class Cell:
+    """
+    The value of a global. A name keeps the Cell it was first defined
+    with, however often it is assigned or defined again.
+    """
+    __slots__ = ('value',)
+
+
+class GlobalEnvironment(Environment):
+    """
+    The globals, with each value held in a Cell: values maps names to their
+    Cells.
+
+    Because names keep their Cells, a Variable or Assign of a global caches
+    the Cell it looked up (see lookup()) and from then on reads or writes
+    the Cell without looking the name up. The Resolver clears the cache, so
+    a tree resolved again for another GlobalEnvironment starts afresh.
+    """
+    def define(self, name: str, value):
+        cell = self.values.get(name)
+        if cell is None:
+            cell = self.values[name] = Cell()
+        cell.value = value
+
+    def assign(self, name: Token, value):
+        self.cell(name).value = value
+
+    def get(self, name: Token):
+        return self.cell(name).value
+
+    def cell(self, name: Token) -> Cell:
+        try:
+            return self.values[name.lexeme]
+        except KeyError:
+            raise RuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+
+    def lookup(self, expr: Expr) -> Cell:
+        """Return the Cell of a Variable or Assign, caching it on expr."""
+        try:
+            cell = self.values[expr.name.lexeme]
+        except KeyError:
+            name = expr.name
+            raise RuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+        expr.cell = cell
+        return cell
+
+
+class SlotEnvironment:
+    """
+    The environment of a block, holding its locals in a list.
+
+    Variables are addressed by the (depth, slot) the Resolver assigned, so no
+    names are looked up at runtime. Only globals live in an Environment.
+    """
+    def __init__(self, enclosing, size: int):
+        self.enclosing = enclosing
+        self.values = [None] * size
+
+
 class Interpreter:
-    def __init__(self):
-        self.environment = Environment()
+    # What makes the environment of a block. pylox.make_interpreter() sets
+    # one that also counts them when collecting metrics.
+    new_environment = SlotEnvironment
+
+    def __init__(self, output: Output = None):
+        self.globals = GlobalEnvironment()
+        self.environment = self.globals
         self.errors = []
+        self.output = output if output is not None else StdoutOutput()
 
     def interpret(self, statements: list):
+        resolver = Resolver()
         try:
             for statement in statements:
+                resolver.resolve([statement])
                 self.execute(statement)
         except RuntimeError as error:
             self.errors.append(error)
+        finally:
+            self.output.flush()
+
+    # The statements are what this interpreter runs, so compiling them ahead
+    # of time leaves them as they are. Engines that do compile them, to
+    # closures, bytecode or Python, compile and run them separately too.
+    def compile(self, statements: list):
+        return statements
+
+    def interpret_compiled(self, statements: list):
+        self.interpret(statements)
 
     def visitLiteralExpr(self, expr: Literal):
         return expr.value
 
     def visitUnaryExpr(self, expr: Unary):
         right = self.evaluate(expr.right)
-
-        type = expr.operator.type
-        if type == tt.MINUS:
-            self.checkNumberOperand(expr.operator, right)
-            return -floaty(right)
-
-        if type == tt.BANG:
-            return not truthy(right)
-
-        # Unreachable
-        raise Exception('you dun goofed.')
+        handler = expr.handler
+        if handler is None:
+            # A node the parser didn't build.
+            handler = expr.handler = unary_handlers[expr.operator.type]
+        return handler(expr.operator, right)
 
     def visitVariableExpr(self, expr: Variable):
-        return self.environment.get(expr.name)
-
-    def vistGroupingExpr(self, expr: Grouping):
-        return self.evaluate(expr)
+        if expr.slot is None:
+            cell = expr.cell
+            if cell is not None:
+                return cell.value
+            return self.globals.lookup(expr).value
+        environment = self.environment
+        for _ in range(expr.depth):
+            environment = environment.enclosing
+        return environment.values[expr.slot]
+
+    def visitGroupingExpr(self, expr: Grouping):
+        return self.evaluate(expr.expression)
 
     def visitBinaryExpr(self, expr: Binary):
         left = self.evaluate(expr.left)
         right = self.evaluate(expr.right)
-
-        type = expr.operator.type
-        if type == tt.BANG_EQUAL:       return left != right
-        if type == tt.EQUAL_EQUAL:      return left == right
-        if type == tt.PLUS:
-            if isinstance(left, float) and isinstance(right, float):
-                return floaty(left) + floaty(right)
-            elif isinstance(left, str) and isinstance(right, str):
-                return stringy(left) + stringy(right)
-            raise RuntimeError(expr.operator,
-                               'Operands must be two numbers or two strings.')
-
-        self.checkNumberOperands(expr.operator, left, right)
-        if  type == tt.GREATER:         return floaty(left) >  floaty(right)
-        elif type == tt.GREATER_EQUAL:  return floaty(left) >= floaty(right)
-        elif type == tt.LESS:           return floaty(left) <  floaty(right)
-        elif type == tt.LESS_EQUAL:     return floaty(left) <= floaty(right)
-        elif type == tt.MINUS:          return floaty(left) -  floaty(right)
-        elif type == tt.SLASH:          return floaty(left) /  floaty(right)
-        elif type == tt.STAR:           return floaty(left) *  floaty(right)
-
-        # Unreachable
-        raise Exception('I dun goofed.')
-
-    def checkNumberOperand(self, operator: Token, operand):
-        if isinstance(operand, float): return
-        raise RuntimeError(operator, 'Operand must be a number.')
-
-    def checkNumberOperands(self, operator: Token, left, right):
-        if isinstance(left, float) and isinstance(right, float): return
-        raise RuntimeError(operator, 'Operands must be a numbers.')
+        handler = expr.handler
+        if handler is None:
+            # A node the parser didn't build.
+            handler = expr.handler = binary_handlers[expr.operator.type]
+        return handler(expr.operator, left, right)
 
     def evaluate(self, expr: Expr):
         return expr.accept(self)
@@ -158,7 +212,8 @@ class Interpreter:
             self.environment = previous
 
     def visitBlockStmt(self, stmt: Block):
-        self.executeBlock(stmt.statements, Environment(self.environment))
+        environment = self.new_environment(self.environment, stmt.size)
+        self.executeBlock(stmt.statements, environment)
 
     def visitExpressionStmt(self, stmt: Expression):
         self.evaluate(stmt.expression)
@@ -166,7 +221,7 @@ class Interpreter:
 
     def visitPrintStmt(self, stmt: Print):
         value = self.evaluate(stmt.expression)
-        print(self.stringify(value))
+        self.output.print(stringify(value))
         return None
 
     def visitVarStmt(self, stmt: Var):
@@ -174,19 +229,24 @@ class Interpreter:
             value = self.evaluate(stmt.initializer)
         else:
             value = None
-        self.environment.define(stmt.name.lexeme, value)
+        if stmt.slot is None:
+            self.globals.define(stmt.name.lexeme, value)
+        else:
+            self.environment.values[stmt.slot] = value
 
     def visitAssignExpr(self, expr: Assign):
         value = self.evaluate(expr.value)
-        self.environment.assign(expr.name, value)
+        if expr.slot is None:
+            cell = expr.cell
+            if cell is None:
+                cell = self.globals.lookup(expr)
+            cell.value = value
+            return value
+        environment = self.environment
+        for _ in range(expr.depth):
+            environment = environment.enclosing
+        environment.values[expr.slot] = value
         return value
 
     def stringify(self, value):
-        if value is None:
-            return 'nil'
-        text = str(value)
-        if isinstance(value, float) and text.endswith('.0'):
-            return text[:-2]
-        if isinstance(value, bool):
-            return text.lower()
-        return text
+        return stringify(value)
@@ -0,0 +1,144 @@
+from typing import List
+
+from expr import *
+from interpreter import Interpreter, RuntimeError, stringify
+from operators import binary_handlers, unary_handlers
+from resolver import IterativeResolver
+from stmt import *
+
+# What to do once the operands of a node are on the value stack. The work
+# stack holds nodes to run and (continuation, node) pairs.
+BINARY, UNARY, ASSIGN, PRINT, DISCARD, DEFINE, RESTORE = range(7)
+
+
+class IterativeInterpreter(Interpreter):
+    """
+    An Interpreter that walks the tree with explicit stacks.
+
+    Nodes to run and what to do after them are kept on a work stack, the
+    values of expressions on a value stack, so running a node is a loop
+    iteration rather than a visitor call on the Python stack, and no
+    nesting is too deep to run. Blocks restore the environment they
+    replaced when they end or when an error escapes them, like
+    executeBlock() does. Output and errors are the same as Interpreter's.
+    """
+    def interpret(self, statements: List[Stmt]):
+        resolver = IterativeResolver()
+        try:
+            for statement in statements:
+                resolver.resolve([statement])
+                self.execute(statement)
+        except RuntimeError as error:
+            self.errors.append(error)
+        finally:
+            self.output.flush()
+
+    def evaluate(self, expr: Expr):
+        values = []
+        self.run(expr, values)
+        return values.pop()
+
+    def execute(self, stmt: Stmt):
+        self.run(stmt, [])
+
+    def run(self, node, values: list):
+        """Run node, leaving the value of an expression on values."""
+        environment = previous = self.environment
+        globals = self.globals
+        new_environment = self.new_environment
+        write = self.output.print
+        work = [node]
+        push_work = work.append
+        pop_work = work.pop
+        push = values.append
+        pop = values.pop
+        try:
+            while work:
+                node = pop_work()
+                kind = type(node)
+
+                if kind is tuple:
+                    code, node = node
+                    if code == BINARY:
+                        right = pop()
+                        handler = (node.handler
+                                   or binary_handlers[node.operator.type])
+                        values[-1] = handler(node.operator, values[-1], right)
+                    elif code == PRINT:
+                        write(stringify(pop()))
+                    elif code == DEFINE:
+                        value = pop()
+                        if node.slot is None:
+                            globals.define(node.name.lexeme, value)
+                        else:
+                            environment.values[node.slot] = value
+                    elif code == RESTORE:
+                        # The end of a block, node is the environment
+                        # before it.
+                        environment = node
+                    elif code == DISCARD:
+                        pop()
+                    elif code == ASSIGN:
+                        value = values[-1]
+                        if node.slot is None:
+                            cell = node.cell
+                            if cell is None:
+                                cell = globals.lookup(node)
+                            cell.value = value
+                        else:
+                            target = environment
+                            for _ in range(node.depth):
+                                target = target.enclosing
+                            target.values[node.slot] = value
+                    else:
+                        handler = (node.handler
+                                   or unary_handlers[node.operator.type])
+                        values[-1] = handler(node.operator, values[-1])
+
+                elif kind is Variable:
+                    if node.slot is None:
+                        cell = node.cell
+                        if cell is None:
+                            cell = globals.lookup(node)
+                        push(cell.value)
+                    else:
+                        target = environment
+                        for _ in range(node.depth):
+                            target = target.enclosing
+                        push(target.values[node.slot])
+                elif kind is Literal:
+                    push(node.value)
+                elif kind is Binary:
+                    push_work((BINARY, node))
+                    push_work(node.right)
+                    push_work(node.left)
+                elif kind is Print:
+                    push_work((PRINT, node))
+                    push_work(node.expression)
+                elif kind is Var:
+                    push_work((DEFINE, node))
+                    if node.initializer is None:
+                        push(None)
+                    else:
+                        push_work(node.initializer)
+                elif kind is Block:
+                    push_work((RESTORE, environment))
+                    work.extend(reversed(node.statements))
+                    environment = new_environment(environment, node.size)
+                elif kind is Expression:
+                    push_work((DISCARD, node))
+                    push_work(node.expression)
+                elif kind is Assign:
+                    push_work((ASSIGN, node))
+                    push_work(node.value)
+                elif kind is Grouping:
+                    push_work(node.expression)
+                elif kind is Unary:
+                    push_work((UNARY, node))
+                    push_work(node.right)
+                else:
+                    raise Exception(f'Cannot run {kind.__name__}')
+        finally:
+            # Blocks left by an error are ended here.
+            self.environment = previous
+
@@ -0,0 +1,115 @@
+import json
+import sys
+import time
+from typing import List
+
+from adaptive import AdaptiveInterpreter
+from expr import Expr
+from interpreter import SlotEnvironment
+from output import CountingOutput, Output, StdoutOutput
+from stmt import Block, Stmt
+
+
+class Metrics:
+    """
+    Phase timings and sizes of one run of a script.
+
+    Filled in by pylox.run() and the functions it calls when given one.
+    Times are wall-clock seconds, parse_time includes any constant folding.
+    What wasn't measured stays None: scanning and parsing for statements
+    loaded from the cache (cached is then true), and both, along with the
+    token count, when the script is streamed and they interleave with
+    interpreting.
+
+    environments counts the environments of blocks created while
+    interpreting, which depends on the engine (the vm and python engines
+    keep block locals elsewhere, so create none). max_depth is the deepest
+    nesting of blocks in the program.
+
+    With the adaptive engine, specialized_hits and specialized_misses count
+    the runs of Binary and Unary nodes that took their specialized path and
+    that deoptimized, and generic_runs those that ran the generic handler
+    while not specialized (see AdaptiveInterpreter); they stay None with
+    other engines.
+    """
+    __slots__ = ('scan_time', 'parse_time', 'interpret_time', 'tokens',
+                 'nodes', 'max_depth', 'environments', 'bytes_printed',
+                 'cached', 'specialized_hits', 'specialized_misses',
+                 'generic_runs', '_output', '_start')
+
+    def __init__(self):
+        self.scan_time = None
+        self.parse_time = None
+        self.interpret_time = None
+        self.tokens = None
+        self.nodes = None
+        self.max_depth = None
+        self.environments = None
+        self.bytes_printed = None
+        self.cached = False
+        self.specialized_hits = None
+        self.specialized_misses = None
+        self.generic_runs = None
+
+    def count(self, statements: List[Stmt]):
+        """Add the nodes in statements, and their deepest block nesting."""
+        nodes, max_depth = self.nodes or 0, self.max_depth or 0
+        stack = [(statement, 0) for statement in statements]
+        while stack:
+            node, depth = stack.pop()
+            nodes += 1
+            if isinstance(node, Block):
+                depth += 1
+                max_depth = max(max_depth, depth)
+            for name in node._fields:
+                value = getattr(node, name)
+                if isinstance(value, list):
+                    stack.extend((child, depth) for child in value)
+                elif isinstance(value, (Expr, Stmt)):
+                    stack.append((value, depth))
+        self.nodes = nodes
+        self.max_depth = max_depth
+
+    def start_interpreting(self, output: Output = None) -> Output:
+        """Start measuring, return output wrapped to count what's printed."""
+        if output is None:
+            output = StdoutOutput()
+        self._output = CountingOutput(output)
+        self.environments = 0
+        self._start = time.perf_counter()
+        return self._output
+
+    def new_environment(self, enclosing, size: int) -> SlotEnvironment:
+        """Make the environment of a block, counting it.
+
+        pylox.make_interpreter() gives this to the interpreter in place of
+        SlotEnvironment, so nothing is counted without metrics.
+        """
+        self.environments += 1
+        return SlotEnvironment(enclosing, size)
+
+    def stop_interpreting(self, interpreter=None):
+        """Stop measuring, recording what interpreter did if it adapts."""
+        self.interpret_time = time.perf_counter() - self._start
+        self.bytes_printed = self._output.bytes
+        if isinstance(interpreter, AdaptiveInterpreter):
+            feedback = interpreter.feedback
+            self.specialized_hits = sum(item.hits for item in feedback)
+            self.specialized_misses = sum(item.misses for item in feedback)
+            self.generic_runs = sum(item.generic for item in feedback)
+
+    def as_json(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__
+                if not name.startswith('_')}
+
+    def report(self, file=None):
+        file = sys.stderr if file is None else file
+        for name, value in self.as_json().items():
+            if isinstance(value, float):
+                value = f'{value:.6f}s'
+            print(f'[stats] {name:18} {value}', file=file)
+
+    def write_json(self, path: str):
+        with open(path, 'w') as file:
+            json.dump(self.as_json(), file, indent=2)
+            file.write('\n')
@@ -0,0 +1,102 @@
+from tokens import Token, TokenType as tt
+
+
+class RuntimeError(Exception):
+    def __init__(self, token: Token, message: str):
+        self.token = token
+        self.message = message
+
+    def report(self):
+        return f'{self.message}\n[line {self.token.line}]'
+
+
+# What each operator does to its operands. The parser looks the function
+# up by the operator's kind once, and stores it on the Binary or Unary node
+# as its handler, so running the node is a call rather than a chain of
+# comparisons. Every function is passed the operator token, to report
+# errors at.
+
+def negate(operator: Token, right):
+    if isinstance(right, float): return -right
+    raise RuntimeError(operator, 'Operand must be a number.')
+
+
+def not_(operator: Token, right):
+    return right is None or right is False
+
+
+def equal(operator: Token, left, right):
+    return left == right
+
+
+def not_equal(operator: Token, left, right):
+    return left != right
+
+
+def add(operator: Token, left, right):
+    if ((isinstance(left, float) and isinstance(right, float))
+            or (isinstance(left, str) and isinstance(right, str))):
+        return left + right
+    raise RuntimeError(operator,
+                       'Operands must be two numbers or two strings.')
+
+
+def greater(operator: Token, left, right):
+    if isinstance(left, float) and isinstance(right, float):
+        return left > right
+    raise RuntimeError(operator, 'Operands must be a numbers.')
+
+
+def greater_equal(operator: Token, left, right):
+    if isinstance(left, float) and isinstance(right, float):
+        return left >= right
+    raise RuntimeError(operator, 'Operands must be a numbers.')
+
+
+def less(operator: Token, left, right):
+    if isinstance(left, float) and isinstance(right, float):
+        return left < right
+    raise RuntimeError(operator, 'Operands must be a numbers.')
+
+
+def less_equal(operator: Token, left, right):
+    if isinstance(left, float) and isinstance(right, float):
+        return left <= right
+    raise RuntimeError(operator, 'Operands must be a numbers.')
+
+
+def subtract(operator: Token, left, right):
+    if isinstance(left, float) and isinstance(right, float):
+        return left - right
+    raise RuntimeError(operator, 'Operands must be a numbers.')
+
+
+def divide(operator: Token, left, right):
+    if isinstance(left, float) and isinstance(right, float):
+        return left / right
+    raise RuntimeError(operator, 'Operands must be a numbers.')
+
+
+def multiply(operator: Token, left, right):
+    if isinstance(left, float) and isinstance(right, float):
+        return left * right
+    raise RuntimeError(operator, 'Operands must be a numbers.')
+
+
+binary_handlers = {
+    tt.BANG_EQUAL:      not_equal,
+    tt.EQUAL_EQUAL:     equal,
+    tt.GREATER:         greater,
+    tt.GREATER_EQUAL:   greater_equal,
+    tt.LESS:            less,
+    tt.LESS_EQUAL:      less_equal,
+    tt.MINUS:           subtract,
+    tt.PLUS:            add,
+    tt.SLASH:           divide,
+    tt.STAR:            multiply,
+}
+
+unary_handlers = {
+    tt.BANG:            not_,
+    tt.MINUS:           negate,
+}
@@ -0,0 +1,103 @@
+from typing import List
+
+from expr import *
+from interpreter import Interpreter, RuntimeError
+from stmt import *
+
+
+class ConstantFolder:
+    """
+    An optimization pass that replaces operations on literals by their value.
+
+    A Binary, Unary or Grouping whose operands are (or fold to) literals is
+    evaluated once, by the Interpreter, and replaced with a Literal. An
+    operation that would fail at runtime is left alone, so the program still
+    fails there with the same message and line. Statements are modified in
+    place, folded counts the nodes that were replaced.
+    """
+    def __init__(self):
+        self.folded = 0
+        self.interpreter = Interpreter()
+
+    def fold(self, statements: List[Stmt]) -> List[Stmt]:
+        # Nodes to fold, and (method, node) pairs to call once the nodes
+        # pushed after them have been folded. An expression leaves what it
+        # folded to on values, so no nesting is too deep to fold.
+        work = list(reversed(statements))
+        push = work.append
+        values = []
+        push_value = values.append
+        fold_binary, fold_unary = self.fold_binary, self.fold_unary
+        fold_grouping = self.fold_grouping
+        while work:
+            node = work.pop()
+            kind = type(node)
+            if kind is tuple:
+                method, node = node
+                method(node, values)
+            elif kind is Literal or kind is Variable:
+                push_value(node)
+            elif kind is Binary:
+                push((fold_binary, node))
+                push(node.right)
+                push(node.left)
+            elif kind is Unary:
+                push((fold_unary, node))
+                push(node.right)
+            elif kind is Grouping:
+                push((fold_grouping, node))
+                push(node.expression)
+            elif kind is Assign:
+                push((self.fold_assign, node))
+                push(node.value)
+            elif kind is Print or kind is Expression:
+                push((self.fold_expression, node))
+                push(node.expression)
+            elif kind is Var:
+                if node.initializer is not None:
+                    push((self.fold_initializer, node))
+                    push(node.initializer)
+            elif kind is Block:
+                work.extend(reversed(node.statements))
+            else:
+                raise Exception(f'Cannot fold {kind.__name__}')
+        return statements
+
+    def evaluate(self, expr: Expr) -> Expr:
+        try:
+            value = self.interpreter.evaluate(expr)
+        except (RuntimeError, ZeroDivisionError):
+            return expr
+        self.folded += 1
+        return Literal(value)
+
+    def fold_expression(self, stmt, values: list):
+        stmt.expression = values.pop()
+
+    def fold_initializer(self, stmt: Var, values: list):
+        stmt.initializer = values.pop()
+
+    def fold_assign(self, expr: Assign, values: list):
+        expr.value = values.pop()
+        values.append(expr)
+
+    def fold_binary(self, expr: Binary, values: list):
+        expr.right = values.pop()
+        expr.left = values.pop()
+        if isinstance(expr.left, Literal) and isinstance(expr.right, Literal):
+            # Its operands are literals, so evaluating it doesn't recurse.
+            expr = self.evaluate(expr)
+        values.append(expr)
+
+    def fold_grouping(self, expr: Grouping, values: list):
+        expr.expression = values[-1]
+        if isinstance(expr.expression, Literal):
+            self.folded += 1
+        else:
+            values[-1] = expr
+
+    def fold_unary(self, expr: Unary, values: list):
+        expr.right = values.pop()
+        if isinstance(expr.right, Literal):
+            expr = self.evaluate(expr)
+        values.append(expr)
@@ -0,0 +1,101 @@
+import os
+import sys
+
+
+class Output:
+    """
+    Where a Lox print statement writes.
+
+    print() is called with each printed line, without its newline. Engines
+    call flush() when interpret() returns, and before a runtime error is
+    reported, so a buffering Output never reorders its lines with stderr.
+    """
+    def print(self, line: str):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+
+class StdoutOutput(Output):
+    """Print each line to sys.stdout straight away, with the builtin print().
+
+    The stream is looked up on every line, so contextlib.redirect_stdout()
+    works.
+    """
+    print = staticmethod(print)
+
+
+class BufferedOutput(Output):
+    """
+    Collect lines and write them out together, once about buffer_size
+    characters are waiting or on flush().
+
+    Lines are written to file, sys.stdout when None (looked up at each
+    write), with one write() call per flush instead of a print() per line.
+    """
+    def __init__(self, file=None, buffer_size: int = 1 << 16):
+        self.file = file
+        self.buffer_size = buffer_size
+        self.lines = []
+        self.size = 0
+
+    def print(self, line: str):
+        self.lines.append(line)
+        self.size += len(line) + 1
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            self.lines.append('')
+            text = '\n'.join(self.lines)
+            self.lines = []
+            self.size = 0
+            self.write(text)
+
+    def write(self, text: str):
+        file = sys.stdout if self.file is None else self.file
+        file.write(text)
+        file.flush()
+
+
+class FileDescriptorOutput(BufferedOutput):
+    """
+    A BufferedOutput that writes UTF-8 straight to a file descriptor with
+    os.write(), bypassing the io stack (and any buffering of its own).
+    """
+    def __init__(self, fd: int, buffer_size: int = 1 << 16):
+        super().__init__(None, buffer_size)
+        self.fd = fd
+
+    def write(self, text: str):
+        data = memoryview(text.encode('utf-8'))
+        while data:
+            written = os.write(self.fd, data)
+            data = data[written:]
+
+
+class ListOutput(Output):
+    """Keep the printed lines in lines, e.g. for tests or embedding."""
+    def __init__(self):
+        self.lines = []
+        self.print = self.lines.append
+
+    def getvalue(self) -> str:
+        """Return what was printed, as it would appear on stdout."""
+        return ''.join(line + '\n' for line in self.lines)
+
+
+class CountingOutput(Output):
+    """Pass lines on to another Output, counting the UTF-8 bytes printed."""
+    def __init__(self, output: Output):
+        self.output = output
+        self.bytes = 0
+
+    def print(self, line: str):
+        self.bytes += len(line.encode('utf-8')) + 1
+        self.output.print(line)
+
+    def flush(self):
+        self.output.flush()
@@ -0,0 +1,114 @@
+import multiprocessing
+import os
+import re
+from typing import List
+
+from pylox import ArrayScanner, ScanError
+from tokens import TokenArray
+
+# What can make a line start be inside a token: strings, which may span
+# lines (an unterminated one runs to the end). Comments are matched so
+# that a '"' in one isn't taken for a string.
+strings_re = re.compile(r'"[^"]*"?|//[^\n]*')
+
+# Below this many characters a chunk isn't worth a task.
+min_chunk_size = 1 << 16
+
+# The source being scanned, inherited by (or sent once to) the workers.
+worker_source = None
+
+
+def find_boundaries(source: str, count: int) -> List[int]:
+    """
+    Return up to count - 1 offsets that split source into chunks of about
+    the same size, each the start of a line that isn't inside a string, so
+    scanning the chunks one by one gives the tokens scanning it all does.
+    """
+    strings = strings_re.finditer(source)
+    match = next(strings, None)
+    boundaries = []
+    for k in range(1, count):
+        target = max(len(source) * k // count,
+                     boundaries[-1] if boundaries else 0)
+        while True:
+            newline = source.find('\n', target)
+            if newline < 0:
+                return boundaries
+            end = newline + 1
+            while match is not None and match.end() <= newline:
+                match = next(strings, None)
+            # A match still straddling the newline is a string around it.
+            if match is None or match.start() > newline:
+                break
+            target = match.end()
+        boundaries.append(end)
+    return boundaries
+
+
+def scan(source: str, jobs: int = None):
+    """
+    Scan source on a pool of jobs worker processes (one per CPU by
+    default), returning the same TokenArray and ScanErrors an ArrayScanner
+    would.
+
+    source is split at line starts outside strings (see find_boundaries()),
+    and each worker scans a chunk in place, starting from the chunk's first
+    line, so its tokens have their offsets and lines in the whole source.
+    The workers send back only the arrays of the TokenArray, which are
+    joined here.
+
+    Only scanning is parallel, parsing the tokens stays in this process:
+    sending a parsed AST back from a worker means pickling and unpickling
+    it, which takes longer than parsing the tokens again.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    count = min(jobs * 4, len(source) // min_chunk_size)
+    boundaries = find_boundaries(source, count) if jobs > 1 else []
+    if not boundaries:
+        scanner = ArrayScanner(source)
+        return scanner.scan_tokens(), scanner.errors
+
+    starts = [0] + boundaries
+    ends = boundaries + [len(source)]
+    chunks = []
+    line = 1
+    for start, end in zip(starts, ends):
+        chunks.append((start, end, line))
+        line += source.count('\n', start, end)
+
+    with multiprocessing.Pool(min(jobs, len(chunks)), set_source,
+                              (source,)) as pool:
+        results = pool.map(scan_chunk, chunks, 1)
+
+    tokens = TokenArray(source)
+    errors = []
+    for kinds, starts, ends, lines, chunk_errors in results:
+        # Every chunk ends with an EOF, only the last one is kept.
+        tokens.kinds.extend(kinds[:-1])
+        tokens.starts.extend(starts[:-1])
+        tokens.ends.extend(ends[:-1])
+        tokens.lines.extend(lines[:-1])
+        errors.extend(ScanError(line, message)
+                      for line, message in chunk_errors)
+    tokens.kinds.append(kinds[-1])
+    tokens.starts.append(starts[-1])
+    tokens.ends.append(ends[-1])
+    tokens.lines.append(lines[-1])
+    return tokens, errors
+
+
+def set_source(source: str):
+    global worker_source
+    worker_source = source
+
+
+def scan_chunk(chunk: tuple):
+    """
+    Scan worker_source[start:end] from line, returning the arrays of the
+    TokenArray and the errors as (line, message) pairs.
+    """
+    start, end, line = chunk
+    scanner = ArrayScanner(worker_source)
+    tokens = scanner.scan_tokens(start, line, endpos=end)
+    errors = [(error.line, error.message) for error in scanner.errors]
+    return tokens.kinds, tokens.starts, tokens.ends, tokens.lines, errors
@@ -1,8 +1,9 @@
-from typing import List
+from typing import Iterable, List
 
 from expr import *
+from operators import binary_handlers, unary_handlers
 from stmt import *
-from tokens import Token, TokenType, TokenType as tt
+from tokens import Token, TokenArray, TokenType, TokenType as tt
 
 
 class ParseError(Exception):
@@ -46,16 +47,23 @@ class Parser:
                | "(" expression ")"
                | IDENTIFIER ;
     """
-    def __init__(self, tokens: List[Token]):
-        self.tokens = tokens
+    def __init__(self, tokens: Iterable[Token]):
+        # Tokens are pulled one at a time, so tokens may be a lazy iterator
+        # (e.g. Scanner.iter_tokens()). Only the previous and the current
+        # token are kept.
+        self.tokens = iter(tokens)
         self.errors = []
         self.current = 0
+        self._previous = None
+        self._current = next(self.tokens)
 
     def parse(self):
-        statements = []
+        return list(self.iter_parse())
+
+    def iter_parse(self):
+        """Generate top-level declarations, one as soon as it is parsed."""
         while not self.is_at_end():
-            statements.append(self.declaration())
-        return statements
+            yield self.declaration()
 
     def expression(self):
         return self.assignment()
@@ -121,6 +129,7 @@ class Parser:
             operator = self.previous()
             right = self.comparison()
             expr = Binary(expr, operator, right)
+            expr.handler = binary_handlers[operator.type]
         return expr
 
     def comparison(self):
@@ -129,6 +138,7 @@ class Parser:
             operator = self.previous()
             right = self.term()
             expr = Binary(expr, operator, right)
+            expr.handler = binary_handlers[operator.type]
         return expr
 
     def term(self):
@@ -137,6 +147,7 @@ class Parser:
             operator = self.previous()
             right = self.factor()
             expr = Binary(expr, operator, right)
+            expr.handler = binary_handlers[operator.type]
         return expr
 
     def factor(self):
@@ -145,13 +156,16 @@ class Parser:
             operator = self.previous()
             right = self.unary()
             expr = Binary(expr, operator, right)
+            expr.handler = binary_handlers[operator.type]
         return expr
 
     def unary(self):
         if self.match(tt.BANG, tt.MINUS):
             operator = self.previous()
             right = self.unary()
-            return Unary(operator, right)
+            expr = Unary(operator, right)
+            expr.handler = unary_handlers[operator.type]
+            return expr
 
         return self.primary()
 
@@ -190,6 +204,8 @@ class Parser:
 
     def advance(self):
         if not self.is_at_end():
+            self._previous = self._current
+            self._current = next(self.tokens)
             self.current += 1
         return self.previous()
 
@@ -197,10 +213,13 @@ class Parser:
         return self.peek().type == tt.EOF
 
     def peek(self):
-        return self.tokens[self.current]
+        return self._current
+
+    def peek_type(self) -> TokenType:
+        return self._current.type
 
     def previous(self):
-        return self.tokens[self.current - 1]
+        return self._previous
 
     def error(self, token: Token, message: str):
         err = ParseError(token, message)
@@ -227,3 +246,200 @@ class Parser:
                 return
 
             self.advance()
+
+
+class ArrayParser(Parser):
+    """
+    A Parser over a TokenArray.
+
+    Checking and consuming tokens only compares kinds and moves an index, a
+    Token is built only for tokens the AST or an error keeps.
+    """
+    def __init__(self, tokens: TokenArray):
+        self.tokens = tokens
+        self.kinds = tokens.kinds
+        self.errors = []
+        self.current = 0
+
+    def match(self, *types: List[TokenType]):
+        kind = self.kinds[self.current]
+        if kind in types and kind != tt.EOF:
+            self.current += 1
+            return True
+        return False
+
+    def check(self, type: TokenType):
+        return self.kinds[self.current] == type and type != tt.EOF
+
+    def consume(self, type: TokenType, message: str):
+        if self.check(type):
+            self.current += 1
+            # Of the tokens consumed, the AST only keeps variable names.
+            if type == tt.IDENTIFIER:
+                return self.previous()
+
+    def advance(self):
+        if not self.is_at_end():
+            self.current += 1
+        return self.previous()
+
+    def is_at_end(self):
+        return self.kinds[self.current] == tt.EOF
+
+    def peek(self):
+        return self.tokens[self.current]
+
+    def peek_type(self) -> TokenType:
+        # The kind itself, which compares and hashes as its TokenType.
+        return self.kinds[self.current]
+
+    def previous(self):
+        return self.tokens[self.current - 1]
+
+
+# Precedences of the operators PrattParser puts on its stack. Binary
+# operators bind tighter the higher theirs, and are left-associative.
+GROUP, ASSIGN, UNARY = -1, 0, 5
+binary_precedence = {
+    tt.BANG_EQUAL:      1,
+    tt.EQUAL_EQUAL:     1,
+    tt.GREATER:         2,
+    tt.GREATER_EQUAL:   2,
+    tt.LESS:            2,
+    tt.LESS_EQUAL:      2,
+    tt.MINUS:           3,
+    tt.PLUS:            3,
+    tt.SLASH:           4,
+    tt.STAR:            4,
+}
+# What each prefix token pushes.
+prefix_precedence = {
+    tt.BANG:            UNARY,
+    tt.MINUS:           UNARY,
+    tt.LEFT_PAREN:      GROUP,
+}
+keyword_literals = {
+    tt.FALSE:           False,
+    tt.TRUE:            True,
+    tt.NIL:             None,
+}
+
+
+class PrattParser(Parser):
+    """
+    A Parser that parses expressions by operator precedence, with tables
+    and an explicit stack instead of a method per precedence level.
+
+    It builds the same trees and reports the same errors as Parser, but
+    looks at each token once rather than once per level, and parentheses,
+    prefix operators and blocks are pushed on a list rather than recursed
+    into, so no nesting is too deep to parse.
+    """
+    def declaration(self):
+        # The statements parsed so far in each block still open.
+        blocks = []
+        while True:
+            if blocks and (self.check(tt.RIGHT_BRACE) or self.is_at_end()):
+                self.consume(tt.RIGHT_BRACE, "Expect '}' after block.")
+                statement = Block(blocks.pop())
+            elif self.match(tt.LEFT_BRACE):
+                blocks.append([])
+                continue
+            else:
+                statement = self.simple_declaration()
+            if not blocks:
+                return statement
+            blocks[-1].append(statement)
+
+    def simple_declaration(self):
+        """Parse a declaration that isn't a block, like declaration()."""
+        try:
+            if self.match(tt.VAR):
+                return self.var_declaration()
+            if self.match(tt.PRINT):
+                return self.printStatement()
+            return self.expressionStatement()
+        except ParseError:
+            self.synchronize()
+            return None
+
+    def expression(self):
+        peek_type, advance = self.peek_type, self.advance
+        # Operands are expressions, operators (precedence, token) pairs,
+        # with a (GROUP, None) for each '(' still open.
+        operands = []
+        operators = []
+        while True:
+            # An operand: any prefix operators and '(', then a primary.
+            type = peek_type()
+            precedence = prefix_precedence.get(type)
+            while precedence is not None:
+                operators.append((precedence, advance()))
+                type = peek_type()
+                precedence = prefix_precedence.get(type)
+            operands.append(self.primary_operand(type))
+
+            # What follows it, up to an operator that takes another operand.
+            while True:
+                type = peek_type()
+                precedence = binary_precedence.get(type)
+                if precedence is not None:
+                    self.reduce(operands, operators, precedence)
+                    operators.append((precedence, advance()))
+                    break
+                if type == tt.EQUAL:
+                    # Right-associative, its target is all since the last
+                    # '(' or '='.
+                    self.reduce(operands, operators, ASSIGN + 1)
+                    operators.append((ASSIGN, advance()))
+                    break
+
+                self.reduce(operands, operators, ASSIGN)
+                if not operators:
+                    return operands.pop()
+                # Close the innermost '('. If the ')' is missing, Parser
+                # lets that pass, and so does this: the token ends every
+                # open group.
+                operators.pop()
+                operands.append(Grouping(operands.pop()))
+                if type == tt.RIGHT_PAREN:
+                    advance()
+
+    def primary_operand(self, type: TokenType):
+        if type in keyword_literals:
+            self.advance()
+            return Literal(keyword_literals[type])
+        elif type == tt.NUMBER or type == tt.STRING:
+            return Literal(self.advance().literal)
+        elif type == tt.IDENTIFIER:
+            return Variable(self.advance())
+        raise self.error(self.peek(), 'Expect expression')
+
+    def reduce(self, operands: list, operators: list, precedence: int):
+        """
+        Apply the operators on top of the stack that bind at least as
+        tightly as precedence to their operands.
+        """
+        while operators and operators[-1][0] >= precedence:
+            top, operator = operators.pop()
+            if top == UNARY:
+                expr = Unary(operator, operands.pop())
+                expr.handler = unary_handlers[operator.type]
+                operands.append(expr)
+            elif top == ASSIGN:
+                value = operands.pop()
+                target = operands.pop()
+                if isinstance(target, Variable):
+                    operands.append(Assign(target.name, value))
+                else:
+                    self.error(operator, 'Invalid assignment target.')
+                    operands.append(target)
+            else:
+                right = operands.pop()
+                expr = Binary(operands.pop(), operator, right)
+                expr.handler = binary_handlers[operator.type]
+                operands.append(expr)
+
+
+class ArrayPrattParser(PrattParser, ArrayParser):
+    """A PrattParser over a TokenArray."""
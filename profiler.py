@@ -0,0 +1,148 @@
+import json
+import sys
+import time
+
+from expr import Expr
+from interpreter import Interpreter
+from output import Output
+from stmt import Stmt
+from tokens import Token
+
+
+class Profile:
+    """
+    Where a ProfilingInterpreter spent its time, in seconds.
+
+    nodes maps the visit method for a kind of node (visitBinaryExpr, ...) to
+    [calls, cumulative time, self time]. Cumulative time counts a node
+    nested in a node of the same kind once, like cProfile does for
+    recursive calls. lines maps a source line to [nodes run, self time].
+    Nodes that carry no token, like the literal in `print "x";`, are put on
+    the line of the node they are part of, or on line None.
+    """
+    def __init__(self):
+        self.nodes = {}
+        self.lines = {}
+
+    @property
+    def total(self) -> float:
+        return sum(stats[2] for stats in self.nodes.values())
+
+    def report(self, file=None, limit: int = 20):
+        """Print the nodes and the lines that took longest, by self time."""
+        file = sys.stderr if file is None else file
+        calls = sum(stats[0] for stats in self.nodes.values())
+        print(f'[profile] {calls} nodes run in {self.total:.6f}s', file=file)
+        print(f'{"calls":>10} {"cumtime":>10} {"selftime":>10}  node',
+              file=file)
+        for name, (count, cumulative, own) in self.sorted(self.nodes, limit):
+            print(f'{count:10} {cumulative:10.6f} {own:10.6f}  {name}',
+                  file=file)
+        print(f'{"nodes":>10} {"selftime":>10}  line', file=file)
+        for line, (count, own) in self.sorted(self.lines, limit):
+            where = '?' if line is None else line
+            print(f'{count:10} {own:10.6f}  {where}', file=file)
+
+    def as_json(self) -> dict:
+        return {
+            'total': self.total,
+            'nodes': [{'node': name, 'calls': count,
+                       'cumulative': cumulative, 'self': own}
+                      for name, (count, cumulative, own)
+                      in self.sorted(self.nodes)],
+            'lines': [{'line': line, 'nodes': count, 'self': own}
+                      for line, (count, own) in self.sorted(self.lines)],
+        }
+
+    def write_json(self, path: str):
+        with open(path, 'w') as file:
+            json.dump(self.as_json(), file, indent=2)
+            file.write('\n')
+
+    def sorted(self, stats: dict, limit: int = None) -> list:
+        items = sorted(stats.items(), key=lambda item: item[1][-1],
+                       reverse=True)
+        return items if limit is None else items[:limit]
+
+
+class ProfilingInterpreter(Interpreter):
+    """
+    An Interpreter that times every node it evaluates or executes.
+
+    The plain Interpreter is left untouched, so profiling costs nothing
+    unless this class is used. Times include the profiler's own overhead,
+    which is about the same for every node, so compare them with each
+    other rather than with an unprofiled run.
+    """
+    def __init__(self, output: Output = None, profile: Profile = None):
+        super().__init__(output)
+        self.profile = profile if profile is not None else Profile()
+        self.names = {}
+        self.node_lines = {}
+        # The time spent in the children of each node being run, and the
+        # lines of those nodes.
+        self.children = [0.0]
+        self.line_stack = [None]
+        # How many nodes of each kind are being run, for recursion.
+        self.active = {}
+
+    def evaluate(self, expr: Expr):
+        return self.measure(expr, Interpreter.evaluate)
+
+    def execute(self, stmt: Stmt):
+        return self.measure(stmt, Interpreter.execute)
+
+    def measure(self, node, run):
+        name = self.names.get(type(node))
+        if name is None:
+            kind = 'Expr' if isinstance(node, Expr) else 'Stmt'
+            name = f'visit{type(node).__name__}{kind}'
+            self.names[type(node)] = name
+        line = self.node_lines.get(node, 0)
+        if line == 0:
+            line = self.node_lines[node] = find_line(node)
+        if line is None:
+            line = self.line_stack[-1]
+
+        children, active = self.children, self.active
+        children.append(0.0)
+        self.line_stack.append(line)
+        active[name] = active.get(name, 0) + 1
+        start = time.perf_counter()
+        try:
+            return run(self, node)
+        finally:
+            elapsed = time.perf_counter() - start
+            own = elapsed - children.pop()
+            children[-1] += elapsed
+            self.line_stack.pop()
+            active[name] -= 1
+
+            stats = self.profile.nodes.get(name)
+            if stats is None:
+                stats = self.profile.nodes[name] = [0, 0.0, 0.0]
+            stats[0] += 1
+            stats[2] += own
+            if not active[name]:
+                stats[1] += elapsed
+
+            stats = self.profile.lines.get(line)
+            if stats is None:
+                stats = self.profile.lines[line] = [0, 0.0]
+            stats[0] += 1
+            stats[1] += own
+
+
+def find_line(node) -> int:
+    """Return the line of the first token in node, None if it has none."""
+    nodes = [node]
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, Token):
+            return node.line
+        if isinstance(node, list):
+            nodes.extend(reversed(node))
+        elif isinstance(node, (Expr, Stmt)):
+            nodes.extend(getattr(node, name)
+                         for name in reversed(node._fields))
+    return None
@@ -1,11 +1,29 @@
 #!/usr/bin/env python3.6
 
-import functools
+import argparse
+import mmap
+import os
+import re
+import stat
 import sys
+import time
+from collections import OrderedDict
 
+import cache
+from adaptive import AdaptiveInterpreter
+from closures import ClosureInterpreter
+from codegen import PythonInterpreter, dump, translate
 from interpreter import Interpreter
-from parser import Parser
-from tokens import Token, TokenType, TokenType as tt
+from iterative import IterativeInterpreter
+from metrics import Metrics
+from optimizer import ConstantFolder
+from output import FileDescriptorOutput, ListOutput, Output
+from parser import ArrayParser, ArrayPrattParser, Parser, PrattParser
+from profiler import Profile, ProfilingInterpreter
+from sampler import Sampler
+from tokens import (MappedTokenArray, Token, TokenArray, TokenType,
+                    TokenType as tt)
+from vm import VM
 
 
 class ScanError(Exception):
@@ -37,8 +55,46 @@ class Scanner:
         'while':  tt.WHILE,
     }
 
-    def __init__(self, source: str):
+    token_re = re.compile(r'''
+          (?P<SPACE>[ \r\t]+)
+        | (?P<NEWLINE>\n+)
+        | (?P<NUMBER>[0-9]+(?:\.[0-9]+)?)
+        | (?P<IDENTIFIER>[A-Za-z_][A-Za-z0-9_]*)
+        | (?P<COMMENT>//)
+        | (?P<STRING>")
+        | (?P<PUNCTUATION>[!=<>]=?|[(){},.\-+;*/])
+        ''', re.VERBOSE)
+
+    punctuation = {
+        '(':  tt.LEFT_PAREN,
+        ')':  tt.RIGHT_PAREN,
+        '{':  tt.LEFT_BRACE,
+        '}':  tt.RIGHT_BRACE,
+        ',':  tt.COMMA,
+        '.':  tt.DOT,
+        '-':  tt.MINUS,
+        '+':  tt.PLUS,
+        ';':  tt.SEMICOLON,
+        '*':  tt.STAR,
+        '/':  tt.SLASH,
+        '!':  tt.BANG,
+        '!=': tt.BANG_EQUAL,
+        '=':  tt.EQUAL,
+        '==': tt.EQUAL_EQUAL,
+        '<':  tt.LESS,
+        '<=': tt.LESS_EQUAL,
+        '>':  tt.GREATER,
+        '>=': tt.GREATER_EQUAL,
+    }
+
+    def __init__(self, source, chunk_size: int = 1 << 16):
+        """
+        source is either a str or a text file object. A file can only be
+        scanned with iter_tokens(), which reads it chunk_size characters at
+        a time.
+        """
         self.source = source
+        self.chunk_size = chunk_size
         self.tokens = []
         self.errors = []
 
@@ -46,6 +102,95 @@ class Scanner:
         self.current = 0
         self.line = 1
 
+    def iter_tokens(self):
+        """
+        Generate tokens lazily, ending with EOF. Errors are appended to
+        self.errors as they are found.
+
+        Only the current chunk and any token straddling its end are held in
+        memory. A token is only emitted once at least two characters follow
+        it (the lookahead of a number), or its closing '"' or newline has been
+        seen, so chunk boundaries never split or merge tokens.
+        """
+        if isinstance(self.source, str):
+            chunks = iter((self.source,))
+        else:
+            read, size = self.source.read, self.chunk_size
+            chunks = iter(lambda: read(size), '')
+
+        match = self.token_re.match
+        keywords = self.keywords
+        punctuation = self.punctuation
+        line = self.line
+        buffer, pos = '', 0
+
+        while True:
+            chunk = next(chunks, '')
+            at_end = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            end = len(buffer)
+            limit = end if at_end else end - 2
+
+            while pos < end:
+                m = match(buffer, pos)
+                if m is None:
+                    self.line = line
+                    self.error('Unexpected character.')
+                    pos += 1
+                    continue
+
+                start, stop = pos, m.end()
+                kind = m.lastgroup
+                if kind == 'STRING':
+                    close = buffer.find('"', stop)
+                    if close < 0:
+                        if not at_end:
+                            break
+                        # Unterminated string.
+                        self.line = line + buffer.count('\n', stop)
+                        self.error('Unterminated string.')
+                        line, pos = self.line, end
+                        break
+                    line += buffer.count('\n', stop, close)
+                    pos = close + 1
+                    yield Token(tt.STRING, buffer[start:pos],
+                                buffer[start+1:close], line)
+                    continue
+                elif kind == 'COMMENT':
+                    # A comment goes until the end of the line
+                    pos = buffer.find('\n', stop)
+                    if pos < 0:
+                        if not at_end:
+                            pos = start
+                            break
+                        pos = end
+                    continue
+                elif stop > limit:
+                    break
+
+                pos = stop
+                if kind == 'SPACE':
+                    pass
+                elif kind == 'IDENTIFIER':
+                    text = m.group()
+                    yield Token(keywords.get(text, tt.IDENTIFIER), text, None,
+                                line)
+                elif kind == 'PUNCTUATION':
+                    text = m.group()
+                    yield Token(punctuation[text], text, None, line)
+                elif kind == 'NEWLINE':
+                    line += stop - start
+                else:
+                    text = m.group()
+                    yield Token(tt.NUMBER, text, float(text), line)
+
+            if at_end:
+                break
+
+        self.line = line
+        yield Token(tt.EOF, '', None, line)
+
     def scan_tokens(self):
         while not self.is_at_end():
             self.start = self.current
@@ -179,51 +324,778 @@ class Scanner:
         self.errors.append(err)
 
 
-def run_file(path: str):
-    with open(path, encoding='utf-8') as file:
-        errors, runtime_errors = run(file.read())
+class FastScanner(Scanner):
+    """
+    A Scanner that matches a whole token per step with one master regex.
+
+    It produces the same tokens and errors as Scanner, but avoids a Python
+    method call per character. Comments and string bodies are skipped with
+    str.find().
+    """
+    def scan_tokens(self):
+        self.tokens.extend(self.iter_tokens())
+        return self.tokens
+
+
+class ArrayScanner(Scanner):
+    """
+    A Scanner that produces a TokenArray rather than a list of Tokens.
+
+    kinds_re has one group per kind of token, keywords and each punctuator
+    included, so the index of the group that matched says what was scanned
+    without building a string for the match. Only offsets are stored, the
+    source itself is the only copy of every lexeme.
+    """
+    # Group kinds other than a TokenType's value.
+    SKIP, NEWLINE, RETURN, STRING, UNTERMINATED, UNEXPECTED = range(0, -6, -1)
+
+    token_array = TokenArray
+
+    # Groups for the tokens themselves, also used by MappedScanner.
+    token_groups = [(r'[0-9]+(?:\.[0-9]+)?', tt.NUMBER.value)]
+    token_groups += [(keyword + r'(?![A-Za-z0-9_])', type.value)
+                     for keyword, type in Scanner.keywords.items()]
+    token_groups.append((r'[A-Za-z_][A-Za-z0-9_]*', tt.IDENTIFIER.value))
+    # Longest first, so '==' isn't scanned as '=' '='.
+    token_groups += [(re.escape(text), Scanner.punctuation[text].value)
+                     for text in sorted(Scanner.punctuation, key=len,
+                                        reverse=True)]
+
+    groups = [
+        (r'[ \r\t]+', SKIP),
+        (r'\n+', NEWLINE),
+        (r'//[^\n]*', SKIP),
+        (r'"[^"]*"', STRING),
+        (r'"[^"]*', UNTERMINATED),
+    ]
+    groups += token_groups
+    groups.append((r'.', UNEXPECTED))
+
+    kinds_re = re.compile('|'.join(f'({pattern})' for pattern, _ in groups))
+    # The kind of each group, by group index.
+    group_kinds = [None] + [kind for _, kind in groups]
+    del groups
+
+    def scan_tokens(self, pos: int = 0, line: int = None, stop=None,
+                    endpos: int = None):
+        """
+        Scan source[pos:endpos], from line (self.line by default), into a
+        TokenArray over the whole source. pos and endpos must not split a
+        token, a string or a comment.
+
+        If stop(offset) is true for the offset a token starts at, scanning
+        ends before that token, without an EOF token, and self.current is
+        set to the offset. Otherwise it is set to endpos. When an error is
+        reported, self.start is the offset of the text it is about.
+        """
+        source = self.source
+        if endpos is None:
+            endpos = len(source)
+        self.tokens = tokens = self.token_array(source)
+        add_kind = tokens.kinds.append
+        add_start = tokens.starts.append
+        add_end = tokens.ends.append
+        add_line = tokens.lines.append
+        group_kinds = self.group_kinds
+        if line is None:
+            line = self.line
+
+        for m in self.kinds_re.finditer(source, pos, endpos):
+            kind = group_kinds[m.lastindex]
+            if kind > 0:
+                start, end = m.span()
+            elif kind == self.SKIP:
+                continue
+            elif kind == self.NEWLINE:
+                start, end = m.span()
+                line += end - start
+                continue
+            elif kind == self.STRING:
+                start, end = m.span()
+                line += self.count_lines(start, end)
+                kind = tt.STRING.value
+            elif kind == self.UNTERMINATED:
+                self.start = m.start()
+                self.line = line + self.count_lines(self.start, endpos)
+                self.error('Unterminated string.')
+                line = self.line
+                continue
+            elif kind == self.RETURN:
+                line += 1
+                continue
+            else:
+                self.start = m.start()
+                self.line = line
+                self.unexpected(m.group())
+                continue
+            if stop is not None and stop(start):
+                # Only a string can span lines, and line is already past it.
+                self.line = line - self.count_lines(start, end)
+                self.current = start
+                return tokens
+            add_kind(kind)
+            add_start(start)
+            add_end(end)
+            add_line(line)
+
+        self.line = line
+        self.current = endpos
+        tokens.append(tt.EOF, endpos, endpos, line)
+        return tokens
+
+    def count_lines(self, start: int, end: int) -> int:
+        """Return the number of line breaks in source[start:end]."""
+        return self.source.count('\n', start, end)
+
+    def unexpected(self, text: str):
+        self.error('Unexpected character.')
+
+
+class MappedScanner(ArrayScanner):
+    """
+    An ArrayScanner over UTF-8 encoded bytes, such as an mmap of a script.
+
+    Everything outside string literals is ASCII, so the source is scanned
+    as bytes and only the lexemes that become tokens are ever decoded, by
+    the MappedTokenArray. Line breaks are counted as in a file read in text
+    mode, where CRLF and a lone CR end a line too, and a non-ASCII character
+    outside a string is one unexpected character however many bytes encode
+    it.
+    """
+    token_array = MappedTokenArray
+
+    groups = [
+        (rb'[ \t]+', ArrayScanner.SKIP),
+        (rb'\n+', ArrayScanner.NEWLINE),
+        (rb'\r\n?', ArrayScanner.RETURN),
+        (rb'//[^\r\n]*', ArrayScanner.SKIP),
+        (rb'"[^"]*"', ArrayScanner.STRING),
+        (rb'"[^"]*', ArrayScanner.UNTERMINATED),
+    ]
+    groups += [(pattern.encode('ascii'), kind)
+               for pattern, kind in ArrayScanner.token_groups]
+    # A lead byte and its continuation bytes, or any other single byte.
+    groups.append((rb'[\xc0-\xff][\x80-\xbf]*|.', ArrayScanner.UNEXPECTED))
+
+    kinds_re = re.compile(b'|'.join(b'(' + pattern + b')'
+                                    for pattern, _ in groups))
+    group_kinds = [None] + [kind for _, kind in groups]
+    del groups
+
+    def count_lines(self, start: int, end: int) -> int:
+        # mmap has no count(), and strings are short, so copy.
+        text = self.source[start:end]
+        lines = text.count(b'\n')
+        if b'\r' in text:
+            lines += text.count(b'\r') - text.count(b'\r\n')
+        return lines
+
+    def unexpected(self, text: bytes):
+        # Invalid UTF-8 fails as it would when reading the file as text.
+        text.decode('utf-8')
+        self.error('Unexpected character.')
+
+
+class Options:
+    """
+    How to run a script, passed down from run_file() to the functions that
+    scan, parse and execute it.
+
+    stream, mapped, use_cache and cache_dir choose how the script is read
+    and whether its parse is cached (see run_path()); scanner, scan_jobs,
+    parser and optimize how it is parsed (see parse()); engine, output,
+    profile and metrics how it is executed and measured (see execute()).
+    """
+    __slots__ = ('stream', 'engine', 'optimize', 'verbose', 'use_cache',
+                 'cache_dir', 'scanner', 'mapped', 'output', 'profile',
+                 'metrics', 'scan_jobs', 'parser')
+
+    def __init__(self, stream: bool = False, engine: str = 'tree',
+                 optimize: int = 0, verbose: bool = False,
+                 use_cache: bool = True, cache_dir: str = None,
+                 scanner: str = 'classic', mapped: bool = False,
+                 output: Output = None, profile: Profile = None,
+                 metrics: Metrics = None, scan_jobs: int = 1,
+                 parser: str = 'recursive'):
+        self.stream = stream
+        self.engine = engine
+        self.optimize = optimize
+        self.verbose = verbose
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir
+        self.scanner = scanner
+        self.mapped = mapped
+        self.output = output
+        self.profile = profile
+        self.metrics = metrics
+        self.scan_jobs = scan_jobs
+        self.parser = parser
+
+
+def run_file(path: str, options: Options = None, profile_json: str = None,
+             sampler: Sampler = None, samples: str = None,
+             metrics_json: str = None):
+    """
+    Run the script at path, exiting with 65 after syntax errors and 70
+    after a runtime error.
+
+    With a profile in options, the program is run by a ProfilingInterpreter
+    (so with the tree engine), and the profile is reported on stderr or
+    written as JSON to profile_json. With a sampler, the run is sampled and
+    the collapsed stacks written to the file samples. With metrics, they
+    are filled in and reported on stderr or written as JSON to metrics_json.
+    """
+    options = options or Options()
+    if sampler is not None:
+        sampler.start()
+    try:
+        errors, runtime_errors = run_path(path, options)
+    finally:
+        if sampler is not None:
+            sampler.stop()
+
+    if sampler is not None:
+        with open(samples, 'w') as file:
+            sampler.write(file)
+    profile, metrics = options.profile, options.metrics
+    if profile is not None:
+        if profile_json is not None:
+            profile.write_json(profile_json)
+        else:
+            profile.report()
+    if metrics is not None:
+        if metrics_json is not None:
+            metrics.write_json(metrics_json)
+        else:
+            metrics.report()
     if errors:
         sys.exit(65)
     if runtime_errors:
         sys.exit(70)
 
 
-def run_prompt():
-    while True:
-        run(input('> '))
+def run_path(path: str, options: Options = None):
+    options = options or Options()
+    mapping = None
+    if options.mapped and not options.stream:
+        mapping = map_file(path)
+    if mapping is None:
+        return read_file(path, options)
+    # The mapped bytes are scanned in place, never read into a str.
+    with mapping:
+        if options.use_cache:
+            return run_cached(path, mapping, options)
+        return run(mapping, options)
+
+
+def read_file(path: str, options: Options = None):
+    options = options or Options()
+    with open(path, encoding='utf-8') as file:
+        if options.stream:
+            return run_stream(file, options)
+        if options.use_cache:
+            return run_cached(path, file.read(), options)
+        return run(file.read(), options)
+
+
+def map_file(path: str):
+    """
+    Return a read-only mmap of the file at path, or None if it can't be
+    mapped: it isn't a regular file (stdin, a pipe, a device...), is empty,
+    or mmap isn't supported for it.
+    """
+    with open(path, 'rb') as file:
+        if not stat.S_ISREG(os.fstat(file.fileno()).st_mode):
+            return None
+        try:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
 
 
-def run(source: str):
-    scanner = Scanner(source)
-    tokens = scanner.scan_tokens()
-    parser = Parser(tokens)
+def dump_python(path: str, optimize: int = 0):
+    """Print the Python that the python engine would run for a script."""
+    with open(path, encoding='utf-8') as file:
+        scanner = Scanner(file.read())
+    parser = Parser(scanner.scan_tokens())
     statements = parser.parse()
 
     errors = scanner.errors + parser.errors
-    for error in  errors:
+    for error in errors:
         print(error.report(), file=sys.stderr)
+    if errors:
+        sys.exit(65)
+    if optimize:
+        ConstantFolder().fold(statements)
+    print(dump(translate(statements)))
 
+
+def run_prompt(engine: str = 'tree', optimize: int = 0, verbose: bool = False,
+               parser: str = 'recursive'):
+    # Variables declared on one line are there on the next.
+    session = Session(engine=engine, optimize=optimize, verbose=verbose,
+                      parser=parser)
+    while True:
+        result = session.run(input('> '))
+        print(result.output, end='')
+        for error in result.errors + result.runtime_errors:
+            print(error.report(), file=sys.stderr)
+
+
+scanners = {
+    'classic':  Scanner,
+    'fast':     FastScanner,
+    'array':    ArrayScanner,
+}
+
+# Each parser, for a list of Tokens and for a TokenArray.
+parsers = {
+    'recursive':    (Parser, ArrayParser),
+    'pratt':        (PrattParser, ArrayPrattParser),
+}
+
+engines = {
+    'tree':      Interpreter,
+    'iterative': IterativeInterpreter,
+    'adaptive':  AdaptiveInterpreter,
+    'closure':   ClosureInterpreter,
+    'vm':        VM,
+    'python':    PythonInterpreter,
+}
+
+
+def run(source: str, options: Options = None):
+    """
+    Run source, returning its syntax errors and runtime errors. Give
+    options a Metrics to have it filled in with timings and sizes of the
+    run, and scan_jobs to scan on that many processes (see parse()).
+    """
+    options = options or Options()
+    statements, errors = parse(source, options.scanner, options.optimize,
+                               options.verbose, metrics=options.metrics,
+                               jobs=options.scan_jobs, parser=options.parser)
     # Stop if there was a syntax error.
     if errors:
         return errors, []
+    return errors, execute(statements, options.engine, options.output,
+                           options.profile, options.metrics, options.verbose)
+
+
+def run_cached(path: str, source: str, options: Options = None):
+    """
+    Like run(), but reuse the statements cached for path if source hasn't
+    changed since, and cache them otherwise.
+    """
+    options = options or Options()
+    statements = cache.load(path, source, options.optimize, options.cache_dir)
+    if statements is not None:
+        if options.verbose:
+            print('[cache] loaded '
+                  f'{cache.cache_path(path, options.cache_dir)}',
+                  file=sys.stderr)
+        if options.metrics is not None:
+            options.metrics.cached = True
+            options.metrics.count(statements)
+        return [], execute(statements, options.engine, options.output,
+                           options.profile, options.metrics, options.verbose)
+
+    statements, errors = parse(source, options.scanner, options.optimize,
+                               options.verbose, metrics=options.metrics,
+                               jobs=options.scan_jobs, parser=options.parser)
+    if errors:
+        return errors, []
+    # Cache before executing, which annotates the statements.
+    cache.store(path, source, options.optimize, statements,
+                options.cache_dir)
+    return errors, execute(statements, options.engine, options.output,
+                           options.profile, options.metrics, options.verbose)
+
+
+def parse(source: str, scanner: str = 'classic', optimize: int = 0,
+          verbose: bool = False, report: bool = True,
+          metrics: Metrics = None, jobs: int = 1,
+          parser: str = 'recursive'):
+    """
+    Scan, parse and optimize source, reporting any syntax errors on stderr
+    unless report is false, and recording timings and sizes in metrics.
 
-    interpreter = Interpreter()
-    interpreter.interpret(statements)
+    source may also be UTF-8 encoded bytes, such as an mmap, which are
+    always scanned by a MappedScanner. Unless jobs is 1, a str source is
+    scanned in chunks on jobs worker processes (one per CPU for None) by
+    parallel.scan(), ignoring scanner. parser names one of parsers.
+    """
+    start = time.perf_counter()
+    if jobs != 1 and isinstance(source, str):
+        # Imported here, parallel imports this module for its workers.
+        import parallel
+        tokens, scan_errors = parallel.scan(source, jobs)
+    else:
+        if isinstance(source, str):
+            scanner = scanners[scanner](source)
+        else:
+            scanner = MappedScanner(source)
+        tokens = scanner.scan_tokens()
+        scan_errors = scanner.errors
+    scanned = time.perf_counter()
+    token_parser, array_parser = parsers[parser]
+    if isinstance(tokens, TokenArray):
+        parser = array_parser(tokens)
+    else:
+        parser = token_parser(tokens)
+    statements = parser.parse()
+
+    errors = scan_errors + parser.errors
+
+    if report:
+        for error in errors:
+            print(error.report(), file=sys.stderr)
+
+    if optimize and not errors:
+        folder = ConstantFolder()
+        folder.fold(statements)
+        if verbose:
+            report_folded(folder)
+
+    if metrics is not None:
+        metrics.scan_time = scanned - start
+        metrics.parse_time = time.perf_counter() - scanned
+        metrics.tokens = len(tokens)
+        if not errors:
+            metrics.count(statements)
+    return statements, errors
+
+
+def execute(statements: list, engine: str = 'tree', output: Output = None,
+            profile: Profile = None, metrics: Metrics = None,
+            verbose: bool = False):
+    """
+    Execute statements, printing to output (stdout by default) and reporting
+    any runtime errors. With a profile, engine is ignored and statements
+    are run by a ProfilingInterpreter recording into it. If verbose, the
+    adaptive engine reports how its nodes specialized.
+    """
+    if metrics is not None:
+        output = metrics.start_interpreting(output)
+    interpreter = make_interpreter(engine, output, profile, metrics)
+    try:
+        interpreter.interpret(statements)
+    finally:
+        if metrics is not None:
+            metrics.stop_interpreting(interpreter)
+    if verbose:
+        report_adaptive(interpreter)
 
     runtime_errors = interpreter.errors
+    for error in runtime_errors:
+        print(error.report(), file=sys.stderr)
+    return runtime_errors
+
+
+class Result:
+    """
+    What running a snippet in a Session did: what it printed, its syntax
+    errors (if any, nothing was executed) and its runtime errors.
+    """
+    __slots__ = ('output', 'errors', 'runtime_errors')
+
+    def __init__(self, output: str, errors: list, runtime_errors: list):
+        self.output = output
+        self.errors = errors
+        self.runtime_errors = runtime_errors
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors and not self.runtime_errors
+
+    def __repr__(self):
+        args = f'{self.output!r}, {self.errors!r}, {self.runtime_errors!r}'
+        return f'{self.__class__.__name__}({args})'
+
+
+class Session:
+    """
+    Runs snippets one after the other against the same globals.
+
+    Unlike run(), one interpreter is kept for the whole session, and output
+    and errors are returned in a Result rather than printed. The last
+    cache_size distinct snippets are kept compiled by the interpreter (see
+    its compile()), so a snippet that is run again is neither scanned,
+    parsed nor compiled again; hits and misses count how often that was the
+    case. A cache_size of 0 disables this.
+    """
+    def __init__(self, engine: str = 'tree', optimize: int = 0,
+                 scanner: str = 'classic', cache_size: int = 128,
+                 verbose: bool = False, parser: str = 'recursive'):
+        self.output = ListOutput()
+        self.interpreter = engines[engine](self.output)
+        self.optimize = optimize
+        self.scanner = scanner
+        self.parser = parser
+        self.cache_size = cache_size
+        self.verbose = verbose
+        # Source -> (compiled statements, syntax errors), least recently
+        # used first.
+        self.compiled = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def globals(self):
+        return self.interpreter.globals
+
+    def run(self, source: str) -> Result:
+        compiled, errors = self.compile(source)
+        if errors:
+            return Result('', errors, [])
+
+        interpreter = self.interpreter
+        count = len(interpreter.errors)
+        interpreter.interpret_compiled(compiled)
+        runtime_errors = interpreter.errors[count:]
+        del interpreter.errors[count:]
+        output = self.output.getvalue()
+        self.output.lines.clear()
+        return Result(output, errors, runtime_errors)
+
+    def compile(self, source: str):
+        """Return the compiled statements and syntax errors for source."""
+        compiled = self.compiled.get(source)
+        if compiled is not None:
+            self.hits += 1
+            self.compiled.move_to_end(source)
+            return compiled
+
+        self.misses += 1
+        statements, errors = parse(source, self.scanner, self.optimize,
+                                   self.verbose, report=False,
+                                   parser=self.parser)
+        if not errors:
+            statements = self.interpreter.compile(statements)
+        compiled = statements, errors
+        if self.cache_size > 0:
+            self.compiled[source] = compiled
+            if len(self.compiled) > self.cache_size:
+                self.compiled.popitem(last=False)
+        return compiled
+
+
+def run_stream(file, options: Options = None):
+    """
+    Scan, parse and execute file one top-level declaration at a time.
+
+    Memory use is bounded by the largest declaration rather than the size of
+    the script. Unlike run(), declarations before the first syntax error
+    have already been executed by the time the error is found. Execution
+    stops there, the rest of the file is still parsed for error reporting.
+    """
+    options = options or Options()
+    metrics, output = options.metrics, options.output
+    scanner = Scanner(file)
+    parser = parsers[options.parser][0](scanner.iter_tokens())
+    folder = ConstantFolder() if options.optimize else None
+
+    def statements():
+        for statement in parser.iter_parse():
+            if scanner.errors or parser.errors:
+                return
+            if folder is not None:
+                folder.fold([statement])
+            if metrics is not None:
+                metrics.count([statement])
+            yield statement
+
+    if metrics is not None:
+        output = metrics.start_interpreting(output)
+    interpreter = make_interpreter(options.engine, output, options.profile,
+                                   metrics)
+    try:
+        interpreter.interpret(statements())
+    finally:
+        if metrics is not None:
+            metrics.stop_interpreting(interpreter)
+    if options.verbose:
+        report_adaptive(interpreter)
+    runtime_errors = interpreter.errors
+    if not runtime_errors:
+        for _ in parser.iter_parse():
+            pass
+    if folder is not None and options.verbose:
+        report_folded(folder)
+
+    errors = scanner.errors + parser.errors
+    for error in errors:
+        print(error.report(), file=sys.stderr)
     for error in runtime_errors:
         print(error.report(), file=sys.stderr)
     return errors, runtime_errors
 
+
+def make_interpreter(engine: str, output: Output = None,
+                     profile: Profile = None, metrics: Metrics = None):
+    if profile is not None:
+        interpreter = ProfilingInterpreter(output, profile)
+    else:
+        interpreter = engines[engine](output)
+    if metrics is not None:
+        interpreter.new_environment = metrics.new_environment
+    return interpreter
+
+
+def report_adaptive(interpreter):
+    if isinstance(interpreter, AdaptiveInterpreter):
+        interpreter.report()
+
+
+def report_folded(folder: ConstantFolder):
+    print(f'[optimizer] folded {folder.folded} constant expression nodes',
+          file=sys.stderr)
+
+
 def main(argv: list):
-    prog = argv.pop(0)
-    if len(argv) > 1:
-        print(f"Usage: {prog} [script]", file=sys.stderr)
-        sys.exit(1)
-    elif len(argv) == 1:
-        run_file(argv[0])
+    arg_parser = argparse.ArgumentParser(prog=argv[0])
+    arg_parser.add_argument('script', nargs='?')
+    arg_parser.add_argument('--stream', action='store_true',
+                            help='execute the script while it is being read')
+    arg_parser.add_argument('--scanner', choices=scanners, default='classic',
+                            help='how to split the script into tokens '
+                                 '(default: %(default)s)')
+    arg_parser.add_argument('--mmap', dest='mapped', action='store_true',
+                            help='scan the script from a memory map of the '
+                                 'file rather than reading it into a '
+                                 'string, ignoring --scanner; stdin, pipes '
+                                 'and --stream read it as usual')
+    arg_parser.add_argument('--scan-jobs', metavar='N', type=int, default=1,
+                            help='scan the script in chunks on N worker '
+                                 'processes, 0 for one per CPU; ignored '
+                                 'with --mmap and --stream '
+                                 '(default: %(default)s)')
+    arg_parser.add_argument('--parser', choices=parsers, default='recursive',
+                            help='how to parse expressions: a method per '
+                                 'precedence level, or operator precedence '
+                                 'with an explicit stack, which handles any '
+                                 'nesting (default: %(default)s)')
+    arg_parser.add_argument('--engine', choices=engines, default='tree',
+                            help='how to execute the program '
+                                 '(default: %(default)s)')
+    arg_parser.add_argument('--dump-python', action='store_true',
+                            help='print the script translated to Python '
+                                 'instead of running it (Python 3.9 or '
+                                 'later)')
+    arg_parser.add_argument('--output-buffer', metavar='SIZE', type=int,
+                            default=0,
+                            help='buffer about SIZE characters of output '
+                                 'and write them to stdout together, rather '
+                                 'than printing each line as it comes')
+    arg_parser.add_argument('--profile', action='store_true',
+                            help='time each kind of node and each line of '
+                                 'the script with the tree engine, and '
+                                 'report on stderr')
+    arg_parser.add_argument('--profile-json', metavar='FILE',
+                            help='like --profile, but write the profile to '
+                                 'FILE as JSON')
+    arg_parser.add_argument('--stats', action='store_true',
+                            help='report phase timings and sizes of the run '
+                                 'on stderr')
+    arg_parser.add_argument('--stats-json', metavar='FILE',
+                            help='like --stats, but write them to FILE as '
+                                 'JSON')
+    arg_parser.add_argument('--sample', metavar='FILE',
+                            help='sample the Lox statements being executed '
+                                 '(tree engine only) and write them to FILE '
+                                 'as collapsed stacks for a flamegraph')
+    arg_parser.add_argument('--sample-interval', metavar='SECONDS',
+                            type=float, default=0.001,
+                            help='CPU time between samples '
+                                 '(default: %(default)s)')
+    arg_parser.add_argument('--batch', metavar='PATH', nargs='+',
+                            help='run many scripts, each on its own as if '
+                                 'given as the script, on a pool of worker '
+                                 'processes: the .lox files under each '
+                                 'directory PATH, or the scripts listed one '
+                                 'per line in PATH')
+    arg_parser.add_argument('-j', '--jobs', type=int, default=None,
+                            help='the number of worker processes for '
+                                 '--batch (default: one per CPU)')
+    arg_parser.add_argument('--batch-json', metavar='FILE',
+                            help='write the status, output and time of '
+                                 'each --batch script to FILE as JSON')
+    arg_parser.add_argument('-O', dest='optimize', action='count', default=0,
+                            help='optimize the program before running it, '
+                                 'by folding constant expressions')
+    # The level can't be -O's own optional argument, which would swallow
+    # the script in `pylox.py -O script.lox`.
+    arg_parser.add_argument('-O0', dest='optimize', action='store_const',
+                            const=0, help="don't optimize (the default)")
+    arg_parser.add_argument('-O1', dest='optimize', action='store_const',
+                            const=1, help='the same as -O')
+    arg_parser.add_argument('-v', '--verbose', action='store_true',
+                            help='report what the optimizer, the cache and '
+                                 'the adaptive engine did on stderr')
+    arg_parser.add_argument('--no-cache', dest='use_cache',
+                            action='store_false',
+                            help='always parse the script, neither reading '
+                                 'nor writing the cache')
+    arg_parser.add_argument('--cache-dir', metavar='DIR',
+                            help='cache parsed scripts in DIR rather than in '
+                                 'a __loxcache__ directory next to each '
+                                 'script')
+    args = arg_parser.parse_args(argv[1:])
+    profiling = args.profile or args.profile_json is not None
+    if profiling and args.engine != 'tree':
+        arg_parser.error('--profile requires the tree engine')
+    if args.sample is not None and args.engine != 'tree':
+        arg_parser.error('--sample requires the tree engine')
+    if args.batch is not None:
+        if args.script is not None or args.dump_python:
+            arg_parser.error('--batch runs the scripts it finds, not a '
+                             'script')
+        if (profiling or args.sample is not None or args.stats
+                or args.stats_json is not None):
+            arg_parser.error('--batch cannot profile, sample or report '
+                             'stats')
+
+    if args.batch is not None:
+        # Imported here, batch imports this module for its workers.
+        import batch
+        options = Options(stream=args.stream, engine=args.engine,
+                          optimize=args.optimize, verbose=args.verbose,
+                          use_cache=args.use_cache, cache_dir=args.cache_dir,
+                          scanner=args.scanner, mapped=args.mapped,
+                          parser=args.parser)
+        sys.exit(batch.main(args.batch, jobs=args.jobs,
+                            summary_json=args.batch_json, options=options))
+    elif args.dump_python:
+        if args.script is None:
+            arg_parser.error('--dump-python requires a script')
+        if sys.version_info < (3, 9):
+            arg_parser.error('--dump-python requires Python 3.9 or later')
+        dump_python(args.script, optimize=args.optimize)
+    elif args.script is not None:
+        metrics = None
+        if args.stats or args.stats_json is not None:
+            metrics = Metrics()
+        sampler = None
+        if args.sample is not None:
+            sampler = Sampler(args.sample_interval,
+                              root=os.path.basename(args.script))
+        output = None
+        if args.output_buffer > 0:
+            output = FileDescriptorOutput(sys.stdout.fileno(),
+                                          args.output_buffer)
+        options = Options(stream=args.stream, engine=args.engine,
+                          optimize=args.optimize, verbose=args.verbose,
+                          use_cache=args.use_cache, cache_dir=args.cache_dir,
+                          scanner=args.scanner, mapped=args.mapped,
+                          output=output,
+                          profile=Profile() if profiling else None,
+                          metrics=metrics, scan_jobs=args.scan_jobs or None,
+                          parser=args.parser)
+        run_file(args.script, options, profile_json=args.profile_json,
+                 sampler=sampler, samples=args.sample,
+                 metrics_json=args.stats_json)
     else:
-        run_prompt()
+        run_prompt(engine=args.engine, optimize=args.optimize,
+                   verbose=args.verbose, parser=args.parser)
 
 
 if __name__ == '__main__':
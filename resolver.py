@@ -0,0 +1,151 @@
+from typing import List
+
+from expr import *
+from stmt import *
+from tokens import Token
+
+
+class Resolver:
+    """
+    A static pass that gives every local variable a lexical address.
+
+    Each Block is annotated with the number of slots its environment needs
+    (size), each Var declared inside a block with its slot, and each Variable
+    and Assign with the depth (number of blocks out) and slot of the
+    declaration it refers to. Names not declared in any enclosing block are
+    globals, they get a slot of None and are looked up by name at runtime.
+    """
+    def __init__(self):
+        # The names declared by each enclosing block, mapped to their slots.
+        self.scopes = []
+        # For each name, the (scope index, slot) of every declaration in
+        # scope, innermost last. This makes resolving a name O(1) rather than
+        # O(depth).
+        self.declarations = {}
+
+    def resolve(self, statements: List[Stmt]):
+        for statement in statements:
+            statement.accept(self)
+
+    def resolve_local(self, expr: Expr, name: Token):
+        declarations = self.declarations.get(name.lexeme)
+        if declarations:
+            index, slot = declarations[-1]
+            expr.depth = len(self.scopes) - 1 - index
+            expr.slot = slot
+        else:
+            expr.depth = None
+            expr.slot = None
+            # Any Cell cached by an earlier run may belong to other globals.
+            expr.cell = None
+
+    def visitBlockStmt(self, stmt: Block):
+        self.scopes.append({})
+        for statement in stmt.statements:
+            statement.accept(self)
+        self.end_scope(stmt)
+
+    def end_scope(self, stmt: Block):
+        scope = self.scopes.pop()
+        for name in scope:
+            self.declarations[name].pop()
+        stmt.size = len(scope)
+
+    def visitExpressionStmt(self, stmt: Expression):
+        stmt.expression.accept(self)
+
+    def visitPrintStmt(self, stmt: Print):
+        stmt.expression.accept(self)
+
+    def visitVarStmt(self, stmt: Var):
+        # The initializer is resolved before the name is declared, so it sees
+        # any outer variable of the same name, just as it does at runtime.
+        if stmt.initializer is not None:
+            stmt.initializer.accept(self)
+        self.declare(stmt)
+
+    def declare(self, stmt: Var):
+        if not self.scopes:
+            stmt.slot = None
+            return
+
+        name = stmt.name.lexeme
+        scope = self.scopes[-1]
+        if name in scope:
+            # Redeclaring a name in the same block reuses its slot.
+            stmt.slot = scope[name]
+        else:
+            stmt.slot = scope[name] = len(scope)
+            declaration = (len(self.scopes) - 1, stmt.slot)
+            self.declarations.setdefault(name, []).append(declaration)
+
+    def visitAssignExpr(self, expr: Assign):
+        expr.value.accept(self)
+        self.resolve_local(expr, expr.name)
+
+    def visitBinaryExpr(self, expr: Binary):
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visitGroupingExpr(self, expr: Grouping):
+        expr.expression.accept(self)
+
+    def visitLiteralExpr(self, expr: Literal):
+        pass
+
+    def visitUnaryExpr(self, expr: Unary):
+        expr.right.accept(self)
+
+    def visitVariableExpr(self, expr: Variable):
+        self.resolve_local(expr, expr.name)
+
+
+class IterativeResolver(Resolver):
+    """
+    A Resolver that walks the tree with an explicit stack rather than
+    recursing, so it handles any nesting, and annotates it the same way.
+    """
+    def resolve(self, statements: List[Stmt]):
+        # Nodes to visit, and (method, node) pairs to call once the nodes
+        # pushed after them have been visited.
+        work = list(reversed(statements))
+        push = work.append
+        resolve_local = self.resolve_local
+        end_scope, declare = self.end_scope, self.declare
+        while work:
+            node = work.pop()
+            kind = type(node)
+            if kind is Variable:
+                resolve_local(node, node.name)
+            elif kind is Literal:
+                pass
+            elif kind is Binary:
+                push(node.right)
+                push(node.left)
+            elif kind is Print or kind is Expression:
+                push(node.expression)
+            elif kind is tuple:
+                method, node = node
+                method(node)
+            elif kind is Var:
+                initializer = node.initializer
+                if initializer is None or type(initializer) is Literal:
+                    declare(node)
+                else:
+                    push((declare, node))
+                    push(initializer)
+            elif kind is Block:
+                self.scopes.append({})
+                push((end_scope, node))
+                work.extend(reversed(node.statements))
+            elif kind is Assign:
+                # Its value can't declare anything, so the order of the two
+                # doesn't matter.
+                resolve_local(node, node.name)
+                push(node.value)
+            elif kind is Grouping:
+                push(node.expression)
+            elif kind is Unary:
+                push(node.right)
+            else:
+                node.accept(self)
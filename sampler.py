@@ -0,0 +1,101 @@
+import collections
+import signal
+import sys
+import threading
+
+from interpreter import Interpreter
+from profiler import find_line
+
+
+class Sampler:
+    """
+    A sampling profiler for programs run by the tree Interpreter.
+
+    Every interval seconds of CPU time, a SIGPROF handler walks the Python
+    stack of the interrupted code. Each Interpreter.execute() frame on it
+    is a Lox statement being executed, from the outermost block down to
+    the current statement, so nothing is tracked while the program runs
+    and the cost is that of taking the samples. Where signals can't be
+    used (not the main thread, no setitimer()), a background thread takes
+    the samples from sys._current_frames() instead.
+
+    samples counts the stacks seen, as collapsed stacks: frames from root
+    down joined by ';', the format flamegraph.pl and speedscope read. A
+    frame is the kind of statement and its line, e.g. block:3;print:5.
+    Samples taken outside any statement (scanning, parsing, resolving)
+    have the root alone.
+    """
+    code = Interpreter.execute.__code__
+
+    def __init__(self, interval: float = 0.001, root: str = 'lox'):
+        self.interval = interval
+        self.root = root.replace(';', '_')
+        self.samples = collections.Counter()
+        self.labels = {}
+        self.thread = None
+        self.stopped = None
+        self.previous_handler = None
+
+    def start(self):
+        if (hasattr(signal, 'setitimer')
+                and threading.current_thread() is threading.main_thread()):
+            self.previous_handler = signal.signal(signal.SIGPROF,
+                                                  self.handle)
+            signal.setitimer(signal.ITIMER_PROF, self.interval,
+                             self.interval)
+        else:
+            target = threading.get_ident()
+            self.stopped = threading.Event()
+            self.thread = threading.Thread(target=self.sample_thread,
+                                           args=(target,), daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        if self.thread is not None:
+            self.stopped.set()
+            self.thread.join()
+            self.thread = None
+        else:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, self.previous_handler)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def handle(self, signum, frame):
+        self.sample(frame)
+
+    def sample_thread(self, target: int):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            if frame is not None:
+                self.sample(frame)
+
+    def sample(self, frame):
+        stack = []
+        code = self.code
+        while frame is not None:
+            if frame.f_code is code:
+                stack.append(self.label(frame.f_locals['stmt']))
+            frame = frame.f_back
+        stack.append(self.root)
+        stack.reverse()
+        self.samples[';'.join(stack)] += 1
+
+    def label(self, stmt) -> str:
+        label = self.labels.get(stmt)
+        if label is None:
+            line = find_line(stmt)
+            where = '?' if line is None else line
+            label = f'{type(stmt).__name__.lower()}:{where}'
+            self.labels[stmt] = label
+        return label
+
+    def write(self, file):
+        """Write the samples to file, one collapsed stack per line."""
+        for stack, count in sorted(self.samples.items()):
+            file.write(f'{stack} {count}\n')
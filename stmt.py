@@ -21,38 +21,70 @@ class StmtVisitor:
 
 
 class Stmt:
+    __slots__ = ()
+
     def accept(visitor: StmtVisitor):
         raise NotImplementedError
 
 
 class Block(Stmt):
+    __slots__ = ('statements', 'size')
+    _fields = ('statements',)
+    _annotations = ('size',)
+
     def __init__(self, statements: List[Stmt]):
         self.statements = statements
+        self.size = None
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visitBlockStmt(self)
 
+    def __repr__(self):
+        return f'Block({self.statements!r})'
+
 
 class Expression(Stmt):
+    __slots__ = ('expression',)
+    _fields = ('expression',)
+    _annotations = ()
+
     def __init__(self, expression: Expr):
         self.expression = expression
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visitExpressionStmt(self)
 
+    def __repr__(self):
+        return f'Expression({self.expression!r})'
+
 
 class Print(Stmt):
+    __slots__ = ('expression',)
+    _fields = ('expression',)
+    _annotations = ()
+
     def __init__(self, expression: Expr):
         self.expression = expression
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visitPrintStmt(self)
 
+    def __repr__(self):
+        return f'Print({self.expression!r})'
+
 
 class Var(Stmt):
+    __slots__ = ('name', 'initializer', 'slot')
+    _fields = ('name', 'initializer')
+    _annotations = ('slot',)
+
     def __init__(self, name: Token, initializer: Expr):
         self.name = name
         self.initializer = initializer
+        self.slot = None
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visitVarStmt(self)
+
+    def __repr__(self):
+        return f'Var({self.name!r}, {self.initializer!r})'
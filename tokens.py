@@ -1,8 +1,19 @@
 import enum
+from array import array
 
 
 @enum.unique
-class TokenType(enum.Enum):
+class TokenType(enum.IntEnum):
+    """
+    The kinds of token, as small ints.
+
+    Being ints, members hash and compare at C speed where the parser and
+    the engines key tables by them, and TokenArray stores their values as
+    they are. They still print as TokenType.NAME.
+    """
+    __str__ = enum.Enum.__str__
+    __format__ = enum.Enum.__format__
+
     # Single-character tokens.
     LEFT_PAREN      = 1
     RIGHT_PAREN     = 2
@@ -53,6 +64,8 @@ class TokenType(enum.Enum):
 
 
 class Token:
+    __slots__ = ('type', 'lexeme', 'literal', 'line')
+
     def __init__(self, type: TokenType, lexeme: str, literal, line: int):
         self.type = type
         self.lexeme = lexeme
@@ -65,3 +78,83 @@ class Token:
     def __repr__(self):
         args = f'{self.type}, {self.lexeme}, {self.literal}, {self.line}'
         return f'{self.__class__.__name__}({args})'
+
+
+# TokenType members by value, for decoding TokenArray.kinds.
+token_types = [None] + list(TokenType)
+
+
+class TokenArray:
+    """
+    Tokens stored as parallel arrays rather than Token objects.
+
+    kinds holds each token's TokenType value, starts and ends its offsets in
+    source, and lines its line. Lexemes and literals stay in source until
+    asked for, indexing a TokenArray builds the Token. Offsets and lines
+    are 32 bit unsigned, enough for any source under 4 GiB.
+    """
+    __slots__ = ('source', 'kinds', 'starts', 'ends', 'lines')
+
+    def __init__(self, source: str):
+        self.source = source
+        self.kinds = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+        self.lines = array('I')
+
+    def append(self, type: TokenType, start: int, end: int, line: int):
+        self.kinds.append(type.value)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, index: int) -> Token:
+        type = token_types[self.kinds[index]]
+        return Token(type, self.lexeme(index), self.literal(index),
+                     self.lines[index])
+
+    def __iter__(self):
+        for index in range(len(self.kinds)):
+            yield self[index]
+
+    def type(self, index: int) -> TokenType:
+        return token_types[self.kinds[index]]
+
+    def lexeme(self, index: int) -> str:
+        return self.source[self.starts[index]:self.ends[index]]
+
+    def literal(self, index: int):
+        type = token_types[self.kinds[index]]
+        if type == TokenType.NUMBER:
+            return float(self.lexeme(index))
+        if type == TokenType.STRING:
+            return self.source[self.starts[index] + 1:self.ends[index] - 1]
+        return None
+
+
+class MappedTokenArray(TokenArray):
+    """
+    A TokenArray over UTF-8 encoded bytes, such as an mmap of a script.
+
+    Offsets are byte offsets and lexemes are decoded when asked for. As in
+    a file read in text mode, CRLF and a lone CR in them read as LF.
+    """
+    __slots__ = ()
+
+    def lexeme(self, index: int) -> str:
+        text = self.source[self.starts[index]:self.ends[index]]
+        text = text.decode('utf-8')
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return text
+
+    def literal(self, index: int):
+        type = token_types[self.kinds[index]]
+        if type == TokenType.NUMBER:
+            return float(self.source[self.starts[index]:self.ends[index]])
+        if type == TokenType.STRING:
+            return self.lexeme(index)[1:-1]
+        return None
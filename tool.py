@@ -4,13 +4,15 @@ import os
 import sys
 
 
-def write_ast(output_dir: str, base_name: str, imports: dict, types: list):
+def write_ast(output_dir: str, base_name: str, imports: dict, types: list,
+              eq: bool = False, repr: bool = True):
     path = os.path.join(output_dir, base_name.lower() + '.py')
     with open(path, 'w', encoding='utf-8') as f:
-        f.write(''.join(define_ast(base_name, imports, types)))
+        f.write(''.join(define_ast(base_name, imports, types, eq, repr)))
 
 
-def define_ast(base_name: str, imports: dict, types: list):
+def define_ast(base_name: str, imports: dict, types: list,
+               eq: bool = False, repr: bool = True):
     for module, members in imports.items():
         yield f'from {module} import {members}\n'
 
@@ -28,6 +30,10 @@ def define_ast(base_name: str, imports: dict, types: list):
 
     yield '\n\n'
     yield f'class {base_name}:\n'
+    # Without empty __slots__ in the base, every node would still get a
+    # __dict__.
+    yield '    __slots__ = ()\n'
+    yield '\n'
     # The base accept() method.
     yield f'    def accept(visitor: {base_name}Visitor):\n'
     yield '        raise NotImplementedError\n'
@@ -37,7 +43,9 @@ def define_ast(base_name: str, imports: dict, types: list):
         yield '\n\n'
         class_name = type.split(':', maxsplit=1)[0].strip()
         fields_sig = type.split(':', maxsplit=1)[1].strip()
-        yield from define_type(base_name, class_name, fields_sig)
+        fields_sig, _, annotations = fields_sig.partition('|')
+        yield from define_type(base_name, class_name, fields_sig.strip(),
+                               annotations.strip(), eq, repr)
 
 
 def define_visitor(base_name: str, types: list):
@@ -49,22 +57,51 @@ def define_visitor(base_name: str, types: list):
         yield f'raise NotImplementedError\n'
 
 
-def define_type(base_name: str, class_name: str, fields_sig: str):
+def define_type(base_name: str, class_name: str, fields_sig: str,
+                annotations: str = '', eq: bool = False, repr: bool = True):
+    fields = [field.split(': ')[0] for field in fields_sig.split(', ')]
+    # Fields listed after a '|' are filled in by later passes (e.g. the
+    # Resolver), or by the parser once the node is built.
+    annotations = [name for name in annotations.split(', ') if name]
+
     yield f'class {class_name}({base_name}):\n'
+    yield f'    __slots__ = {tuple(fields + annotations)!r}\n'
+    # Metadata for passes that walk the tree generically: the child fields
+    # in constructor order, and the fields later passes fill in.
+    yield f'    _fields = {tuple(fields)!r}\n'
+    yield f'    _annotations = {tuple(annotations)!r}\n'
+    yield '\n'
 
     # Initialiser.
     yield f'    def __init__(self, {fields_sig}):\n'
 
     # Store parameters in fields.
-    fields = fields_sig.split(', ')
-    for field in fields:
-        name = field.split(': ')[0]
+    for name in fields:
         yield f'        self.{name} = {name}\n'
+    for name in annotations:
+        yield f'        self.{name} = None\n'
 
     yield f'\n'
     yield f'    def accept(self, visitor: {base_name}Visitor):\n'
     yield f'        return visitor.visit{class_name}{base_name}(self)\n'
 
+    if eq:
+        # Structural equality ignores annotations. It also makes nodes
+        # unhashable, which passes keying dicts by node rely on.
+        other_fields = ' and '.join(f'self.{name} == other.{name}'
+                                    for name in fields)
+        yield '\n'
+        yield '    def __eq__(self, other):\n'
+        yield '        if other.__class__ is not self.__class__:\n'
+        yield '            return NotImplemented\n'
+        yield f'        return {other_fields}\n'
+
+    if repr:
+        args = ', '.join(f'{{self.{name}!r}}' for name in fields)
+        yield '\n'
+        yield '    def __repr__(self):\n'
+        yield f"        return f'{class_name}({args})'\n"
+
 
 def main(argv):
     prog = argv.pop(0)
@@ -75,12 +112,12 @@ def main(argv):
     output_dir = argv[0]
 
     write_ast(output_dir, 'Expr', {'tokens': 'Token'}, [
-        'Assign   : name: Token, value: Expr',
-        'Binary   : left: Expr, operator: Token, right: Expr',
+        'Assign   : name: Token, value: Expr | depth, slot, cell',
+        'Binary   : left: Expr, operator: Token, right: Expr | handler, feedback',
         'Grouping : expression: Expr',
         'Literal  : value',
-        'Unary    : operator: Token, right: Expr',
-        'Variable : name: Token',
+        'Unary    : operator: Token, right: Expr | handler, feedback',
+        'Variable : name: Token | depth, slot, cell',
     ])
 
     write_ast(output_dir, 'Stmt', {
@@ -88,10 +125,10 @@ def main(argv):
         'tokens'    : 'Token',
         'expr'      : 'Expr',
         }, [
-        'Block      : statements: List[Stmt]',
+        'Block      : statements: List[Stmt] | size',
         'Expression : expression: Expr',
         'Print      : expression: Expr',
-        'Var        : name: Token, initializer: Expr',
+        'Var        : name: Token, initializer: Expr | slot',
     ])
 if __name__ == '__main__':
     main(sys.argv)
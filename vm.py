@@ -0,0 +1,371 @@
+import bisect
+import math
+from array import array
+from typing import List
+
+from expr import *
+from interpreter import GlobalEnvironment, RuntimeError, gc_paused, stringify
+from output import Output, StdoutOutput
+from resolver import Resolver
+from stmt import *
+from tokens import Token, TokenType as tt
+
+
+# Opcodes. Every instruction is two bytes, an opcode and an argument. Larger
+# arguments are built from EXTENDED_ARG prefixes, each contributing 8 more
+# high bits, as in CPython's wordcode.
+(
+    CONSTANT, NIL, TRUE, FALSE, POP,
+    GET_LOCAL, SET_LOCAL, GET_GLOBAL, SET_GLOBAL, DEFINE_GLOBAL,
+    EQUAL, NOT_EQUAL, GREATER, GREATER_EQUAL, LESS, LESS_EQUAL,
+    ADD, SUBTRACT, MULTIPLY, DIVIDE, NOT, NEGATE,
+    PRINT, RETURN, EXTENDED_ARG,
+) = range(25)
+
+opnames = [
+    'CONSTANT', 'NIL', 'TRUE', 'FALSE', 'POP',
+    'GET_LOCAL', 'SET_LOCAL', 'GET_GLOBAL', 'SET_GLOBAL', 'DEFINE_GLOBAL',
+    'EQUAL', 'NOT_EQUAL', 'GREATER', 'GREATER_EQUAL', 'LESS', 'LESS_EQUAL',
+    'ADD', 'SUBTRACT', 'MULTIPLY', 'DIVIDE', 'NOT', 'NEGATE',
+    'PRINT', 'RETURN', 'EXTENDED_ARG',
+]
+
+binary_opcodes = {
+    tt.BANG_EQUAL:      NOT_EQUAL,
+    tt.EQUAL_EQUAL:     EQUAL,
+    tt.GREATER:         GREATER,
+    tt.GREATER_EQUAL:   GREATER_EQUAL,
+    tt.LESS:            LESS,
+    tt.LESS_EQUAL:      LESS_EQUAL,
+    tt.MINUS:           SUBTRACT,
+    tt.PLUS:            ADD,
+    tt.SLASH:           DIVIDE,
+    tt.STAR:            MULTIPLY,
+}
+
+unary_opcodes = {
+    tt.BANG:            NOT,
+    tt.MINUS:           NEGATE,
+}
+
+# The operator token an opcode was compiled from, for error reports.
+operator_tokens = {
+    NOT_EQUAL:      (tt.BANG_EQUAL, '!='),
+    EQUAL:          (tt.EQUAL_EQUAL, '=='),
+    GREATER:        (tt.GREATER, '>'),
+    GREATER_EQUAL:  (tt.GREATER_EQUAL, '>='),
+    LESS:           (tt.LESS, '<'),
+    LESS_EQUAL:     (tt.LESS_EQUAL, '<='),
+    SUBTRACT:       (tt.MINUS, '-'),
+    ADD:            (tt.PLUS, '+'),
+    DIVIDE:         (tt.SLASH, '/'),
+    MULTIPLY:       (tt.STAR, '*'),
+    NOT:            (tt.BANG, '!'),
+    NEGATE:         (tt.MINUS, '-'),
+}
+
+
+class Chunk:
+    """
+    A compiled program: bytecode, the constants it refers to, and a table
+    mapping bytecode offsets back to source lines.
+    """
+
+    def __init__(self):
+        self.code = array('B')
+        self.constants = []
+        # Pairs of (offset, line): the instructions from offset onwards came
+        # from line, until the next pair.
+        self.lines = array('I')
+        self.locals = 0
+        self._constant_index = {}
+        self._line = None
+
+    def write(self, opcode: int, arg: int, line: int):
+        if arg > 0xFF:
+            self.write(EXTENDED_ARG, arg >> 8, line)
+            arg &= 0xFF
+        if line != self._line:
+            self.lines.append(len(self.code))
+            self.lines.append(line)
+            self._line = line
+        self.code.append(opcode)
+        self.code.append(arg)
+
+    def add_constant(self, value) -> int:
+        # Keyed by type as well, because 1.0 == True, and by the sign of
+        # numbers, because 0.0 == -0.0.
+        sign = math.copysign(1.0, value) if type(value) is float else None
+        key = (type(value), value, sign)
+        index = self._constant_index.get(key)
+        if index is None:
+            index = self._constant_index[key] = len(self.constants)
+            self.constants.append(value)
+        return index
+
+    def line_at(self, offset: int) -> int:
+        index = bisect.bisect_right(self.lines[::2], offset) - 1
+        return self.lines[2*index + 1]
+
+    def disassemble(self):
+        lines = []
+        extended = 0
+        for offset in range(0, len(self.code), 2):
+            opcode, arg = self.code[offset], self.code[offset + 1] | extended
+            extended = arg << 8 if opcode == EXTENDED_ARG else 0
+            text = f'{self.line_at(offset):4} {offset:6} {opnames[opcode]:16}'
+            if opcode in (CONSTANT, GET_GLOBAL, SET_GLOBAL, DEFINE_GLOBAL):
+                text += f' {arg} ({self.constants[arg]!r})'
+            elif opcode in (GET_LOCAL, SET_LOCAL, EXTENDED_ARG):
+                text += f' {arg}'
+            lines.append(text)
+        return '\n'.join(lines)
+
+
+class Compiler:
+    """
+    Compile resolved statements into a Chunk.
+
+    Locals live in one flat array per chunk. Each block's slots start after
+    those of the blocks enclosing it, so the Resolver's (depth, slot) maps to
+    a fixed index and blocks need no instructions of their own.
+    """
+    def __init__(self):
+        self.chunk = Chunk()
+        self.bases = [0]
+        self.sizes = [0]
+        self.line = 1
+
+    def compile(self, statements: List[Stmt]) -> Chunk:
+        for statement in statements:
+            statement.accept(self)
+        self.emit(RETURN)
+        return self.chunk
+
+    def emit(self, opcode: int, arg: int = 0):
+        self.chunk.write(opcode, arg, self.line)
+
+    def local(self, depth: int, slot: int) -> int:
+        return self.bases[-1 - depth] + slot
+
+    def visitBlockStmt(self, stmt: Block):
+        base = self.bases[-1] + self.sizes[-1]
+        self.bases.append(base)
+        self.sizes.append(stmt.size)
+        self.chunk.locals = max(self.chunk.locals, base + stmt.size)
+        for statement in stmt.statements:
+            statement.accept(self)
+        self.bases.pop()
+        self.sizes.pop()
+
+    def visitExpressionStmt(self, stmt: Expression):
+        stmt.expression.accept(self)
+        self.emit(POP)
+
+    def visitPrintStmt(self, stmt: Print):
+        stmt.expression.accept(self)
+        self.emit(PRINT)
+
+    def visitVarStmt(self, stmt: Var):
+        if stmt.initializer is not None:
+            stmt.initializer.accept(self)
+        else:
+            self.emit(NIL)
+
+        self.line = stmt.name.line
+        if stmt.slot is None:
+            name = self.chunk.add_constant(stmt.name.lexeme)
+            self.emit(DEFINE_GLOBAL, name)
+        else:
+            self.emit(SET_LOCAL, self.local(0, stmt.slot))
+            self.emit(POP)
+
+    def visitAssignExpr(self, expr: Assign):
+        expr.value.accept(self)
+        self.line = expr.name.line
+        if expr.slot is None:
+            self.emit(SET_GLOBAL, self.chunk.add_constant(expr.name.lexeme))
+        else:
+            self.emit(SET_LOCAL, self.local(expr.depth, expr.slot))
+
+    def visitBinaryExpr(self, expr: Binary):
+        expr.left.accept(self)
+        expr.right.accept(self)
+        self.line = expr.operator.line
+        self.emit(binary_opcodes[expr.operator.type])
+
+    def visitGroupingExpr(self, expr: Grouping):
+        expr.expression.accept(self)
+
+    def visitLiteralExpr(self, expr: Literal):
+        value = expr.value
+        if value is None:
+            self.emit(NIL)
+        elif value is True:
+            self.emit(TRUE)
+        elif value is False:
+            self.emit(FALSE)
+        else:
+            self.emit(CONSTANT, self.chunk.add_constant(value))
+
+    def visitUnaryExpr(self, expr: Unary):
+        expr.right.accept(self)
+        self.line = expr.operator.line
+        self.emit(unary_opcodes[expr.operator.type])
+
+    def visitVariableExpr(self, expr: Variable):
+        self.line = expr.name.line
+        if expr.slot is None:
+            self.emit(GET_GLOBAL, self.chunk.add_constant(expr.name.lexeme))
+        else:
+            self.emit(GET_LOCAL, self.local(expr.depth, expr.slot))
+
+
+class VM:
+    """An Interpreter that compiles statements to bytecode and runs that."""
+    def __init__(self, output: Output = None):
+        self.globals = GlobalEnvironment()
+        self.errors = []
+        self.output = output if output is not None else StdoutOutput()
+
+    def interpret(self, statements: List[Stmt]):
+        # Each statement is compiled just before it runs, rather than by
+        # compile(), so run_stream() can pass statements as they're parsed.
+        resolver = Resolver()
+        try:
+            for statement in statements:
+                resolver.resolve([statement])
+                with gc_paused():
+                    chunk = Compiler().compile([statement])
+                self.run(chunk)
+        except RuntimeError as error:
+            self.errors.append(error)
+        finally:
+            self.output.flush()
+
+    def compile(self, statements: List[Stmt]) -> List[Chunk]:
+        """Resolve statements and compile each into its own Chunk."""
+        resolver = Resolver()
+        chunks = []
+        with gc_paused():
+            for statement in statements:
+                resolver.resolve([statement])
+                chunks.append(Compiler().compile([statement]))
+        return chunks
+
+    def interpret_compiled(self, chunks: List[Chunk]):
+        """Run the chunks compile() returned, which may be run again."""
+        try:
+            for chunk in chunks:
+                self.run(chunk)
+        except RuntimeError as error:
+            self.errors.append(error)
+        finally:
+            self.output.flush()
+
+    def error(self, chunk: Chunk, offset: int, token: Token, message: str):
+        token.line = chunk.line_at(offset)
+        return RuntimeError(token, message)
+
+    def operator_error(self, chunk: Chunk, offset: int, message: str):
+        type, lexeme = operator_tokens[chunk.code[offset]]
+        token = Token(type, lexeme, None, 0)
+        return self.error(chunk, offset, token, message)
+
+    def run(self, chunk: Chunk):
+        code = chunk.code
+        constants = chunk.constants
+        locals = [None] * chunk.locals
+        # Names to their Cells.
+        globals = self.globals.values
+        define = self.globals.define
+        write = self.output.print
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        ip = 0
+
+        while True:
+            opcode = code[ip]
+            arg = code[ip + 1]
+            ip += 2
+            while opcode == EXTENDED_ARG:
+                opcode = code[ip]
+                arg = (arg << 8) | code[ip + 1]
+                ip += 2
+
+            if opcode == GET_LOCAL:
+                push(locals[arg])
+            elif opcode == CONSTANT:
+                push(constants[arg])
+            elif opcode == ADD:
+                b = pop()
+                a = stack[-1]
+                if ((type(a) is float and type(b) is float)
+                        or (type(a) is str and type(b) is str)):
+                    stack[-1] = a + b
+                else:
+                    raise self.operator_error(chunk, ip - 2,
+                        'Operands must be two numbers or two strings.')
+            elif SUBTRACT <= opcode <= DIVIDE or GREATER <= opcode <= LESS_EQUAL:
+                b = pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise self.operator_error(chunk, ip - 2,
+                                              'Operands must be a numbers.')
+                if   opcode == SUBTRACT:        stack[-1] = a - b
+                elif opcode == MULTIPLY:        stack[-1] = a * b
+                elif opcode == DIVIDE:          stack[-1] = a / b
+                elif opcode == GREATER:         stack[-1] = a > b
+                elif opcode == GREATER_EQUAL:   stack[-1] = a >= b
+                elif opcode == LESS:            stack[-1] = a < b
+                else:                           stack[-1] = a <= b
+            elif opcode == SET_LOCAL:
+                locals[arg] = stack[-1]
+            elif opcode == POP:
+                pop()
+            elif opcode == GET_GLOBAL:
+                name = constants[arg]
+                try:
+                    push(globals[name].value)
+                except KeyError:
+                    token = Token(tt.IDENTIFIER, name, None, 0)
+                    raise self.error(chunk, ip - 2, token,
+                                     f"Undefined variable '{name}'.")
+            elif opcode == PRINT:
+                write(stringify(pop()))
+            elif opcode == EQUAL:
+                b = pop()
+                stack[-1] = stack[-1] == b
+            elif opcode == NOT_EQUAL:
+                b = pop()
+                stack[-1] = stack[-1] != b
+            elif opcode == NEGATE:
+                a = stack[-1]
+                if type(a) is not float:
+                    raise self.operator_error(chunk, ip - 2,
+                                              'Operand must be a number.')
+                stack[-1] = -a
+            elif opcode == NOT:
+                a = stack[-1]
+                stack[-1] = a is None or a is False
+            elif opcode == NIL:
+                push(None)
+            elif opcode == TRUE:
+                push(True)
+            elif opcode == FALSE:
+                push(False)
+            elif opcode == DEFINE_GLOBAL:
+                define(constants[arg], pop())
+            elif opcode == SET_GLOBAL:
+                name = constants[arg]
+                try:
+                    globals[name].value = stack[-1]
+                except KeyError:
+                    token = Token(tt.IDENTIFIER, name, None, 0)
+                    raise self.error(chunk, ip - 2, token,
+                                     f"Undefined variable '{name}'.")
+            elif opcode == RETURN:
+                return
+            else:
+                raise Exception(f'Unknown opcode {opcode}')